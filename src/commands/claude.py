@@ -1,7 +1,7 @@
 """Claude AI chat commands."""
-import asyncio
 import asyncclick as click
 from util.logging import logger
+from util.streaming import render_markdown_stream
 
 def _get_console():
     """Lazy import Console to improve startup time."""
@@ -22,31 +22,62 @@ class AsyncClaude:
     """Async wrapper for Claude AI client."""
     
     Client = None
+    # Native async SDK clients by API key, shared by every wrapper in the process
+    _clients = {}
 
     def __init__(self, apikey, model="claude-3-5-sonnet-20241022"):
         self.apikey = apikey
         self.model = model
-        anthropic = _get_anthropic()
-        self.client = anthropic.Anthropic(api_key=self.apikey)
+        self.client = self.shared_client(apikey)
+
+    @classmethod
+    def shared_client(cls, apikey):
+        """
+        Return the process-wide AsyncAnthropic client for an API key.
+
+        Each SDK client owns a keep-alive connection pool, so sharing one lets
+        concurrent requests reuse connections instead of reconnecting, and no
+        request needs a thread.
+        """
+        client = cls._clients.get(apikey)
+        if client is None:
+            anthropic = _get_anthropic()
+            client = cls._clients[apikey] = anthropic.AsyncAnthropic(api_key=apikey)
+        return client
+
+    @classmethod
+    async def close_clients(cls):
+        """Close the shared clients and their connection pools."""
+        clients, cls._clients = list(cls._clients.values()), {}
+        # The stored wrapper holds a closed client now; the next create_client builds a new one
+        cls.Client = None
+        for client in clients:
+            await client.close()
 
     async def request(self, text):
         """Send a single request to Claude."""
         try:
-            # Run the blocking operation in a thread pool
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.client.messages.create(
-                    model=self.model,
-                    max_tokens=4000,
-                    messages=[{"role": "user", "content": text}]
-                )
+            response = await self.client.messages.create(
+                model=self.model,
+                max_tokens=4000,
+                messages=[{"role": "user", "content": text}]
             )
             return response.content[0].text
         except Exception as e:
             logger.error(f"Error making Claude request: {e}")
             raise
 
-    async def chat(self):
+    async def stream(self, messages):
+        """Yield the text of Claude's reply to a conversation as it is generated."""
+        try:
+            async with self.client.messages.stream(model=self.model, max_tokens=4000, messages=messages) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming Claude response: {e}")
+            raise
+
+    async def chat(self, stream=True):
         """Start an interactive chat session with Claude."""
         try:
             console = _get_console()
@@ -69,19 +100,29 @@ class AsyncClaude:
                     if not prompt_text:
                         continue
                     
-                    console.print("[dim]Thinking...[/dim]")
-                    
                     # Add user message to conversation
                     conversation.append({"role": "user", "content": prompt_text})
                     
+                    if stream:
+                        # Render the reply as it is generated
+                        console.print("[bold blue]Claude:[/bold blue]")
+                        try:
+                            response_text = await render_markdown_stream(console, self.stream(conversation))
+                        except Exception:
+                            # Keep the history valid for the next turn
+                            conversation.pop()
+                            raise
+                        conversation.append({"role": "assistant", "content": response_text})
+                        console.print("-" * 50)
+                        continue
+                    
+                    console.print("[dim]Thinking...[/dim]")
+                    
                     # Send conversation to Claude
-                    response = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.client.messages.create(
-                            model=self.model,
-                            max_tokens=4000,
-                            messages=conversation
-                        )
+                    response = await self.client.messages.create(
+                        model=self.model,
+                        max_tokens=4000,
+                        messages=conversation
                     )
                     
                     response_text = response.content[0].text
@@ -109,8 +150,9 @@ class AsyncClaude:
 
     @classmethod
     def create_client(cls, apikey, model="claude-3-5-sonnet-20241022"):
-        """Create and store a client instance."""
-        cls.Client = cls(apikey, model)
+        """Create and store a client instance, reusing the pooled SDK client for the key."""
+        if cls.Client is None or (cls.Client.apikey, cls.Client.model) != (apikey, model):
+            cls.Client = cls(apikey, model)
     
     @classmethod
     def get_client(cls):
@@ -122,8 +164,9 @@ class AsyncClaude:
 @click.option("--apikey", help="Claude API key (or set via config)")
 @click.option("--model", default="claude-3-5-sonnet-20241022", help="Claude model to use")
 @click.option("--prompt", help="Single prompt instead of interactive chat")
+@click.option("--stream/--no-stream", default=True, help="Render the reply as it is generated")
 @click.pass_context
-async def claude(ctx, apikey, model, prompt):
+async def claude(ctx, apikey, model, prompt, stream):
     """Chat with Claude AI or send a single prompt."""
     
     console = _get_console()
@@ -151,6 +194,10 @@ async def claude(ctx, apikey, model, prompt):
         if prompt:
             # Single prompt mode
             console.print(f"[bold cyan]🤖 Asking Claude:[/bold cyan] {prompt}")
+            if stream:
+                console.print("[bold blue]Claude:[/bold blue]")
+                await render_markdown_stream(console, client.stream([{"role": "user", "content": prompt}]))
+                return
             response = await client.request(prompt)
             console.print("[bold blue]Claude:[/bold blue]")
             Markdown = _get_markdown()
@@ -158,8 +205,10 @@ async def claude(ctx, apikey, model, prompt):
             console.print(md)
         else:
             # Interactive chat mode
-            await client.chat()
+            await client.chat(stream=stream)
             
     except Exception as e:
         console.print(f"[red]❌ Error: {e}[/red]")
-        logger.error(f"Claude command error: {e}")
\ No newline at end of file
+        logger.error(f"Claude command error: {e}")
+    finally:
+        await AsyncClaude.close_clients()
\ No newline at end of file
@@ -2,6 +2,7 @@
 import asyncio
 import asyncclick as click
 from util.logging import logger
+from util.streaming import render_markdown_stream
 
 def _get_console():
     """Lazy import Console to improve startup time."""
@@ -22,37 +23,72 @@ class AsyncGemini:
     """Async wrapper for Gemini AI client."""
     
     Client = None
+    # Native async (aio) SDK clients by API key, shared by every wrapper in the process
+    _clients = {}
 
     def __init__(self, apikey, version="gemini-2.0-flash"):
         self.apikey = apikey
         self.version = version
-        genai = _get_genai()
-        self.client = genai.Client(api_key=self.apikey)
+        self.client = AsyncGemini.shared_client(apikey)
+
+    @staticmethod
+    def shared_client(apikey):
+        """
+        Return the process-wide async Gemini client (`genai.Client(...).aio`) for an API key.
+
+        Each SDK client owns a keep-alive connection pool, so sharing one lets
+        concurrent requests reuse connections instead of reconnecting, and no
+        request needs a thread.
+        """
+        client = AsyncGemini._clients.get(apikey)
+        if client is None:
+            genai = _get_genai()
+            client = AsyncGemini._clients[apikey] = genai.Client(api_key=apikey).aio
+        return client
+
+    @staticmethod
+    async def close_clients():
+        """Close the shared clients and their connection pools."""
+        clients, AsyncGemini._clients = list(AsyncGemini._clients.values()), {}
+        # The stored wrapper holds a closed client now; the next create_client builds a new one
+        AsyncGemini.Client = None
+        for client in clients:
+            # Older google-genai releases (the floor in pyproject) have no aclose
+            close = getattr(client, "aclose", None)
+            if close is not None:
+                await close()
 
     async def request(self, text):
         """Send a single request to Gemini."""
         try:
-            # Run the blocking operation in a thread pool
-            response = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.client.models.generate_content(
-                    model=self.version, 
-                    contents=[text]
-                )
+            response = await self.client.models.generate_content(
+                model=self.version, 
+                contents=[text]
             )
             return response.text
         except Exception as e:
             logger.error(f"Error making Gemini request: {e}")
             raise
 
-    async def chat(self):
+    async def stream(self, text, chat=None):
+        """Yield the text of Gemini's reply as it is generated, within `chat` if given."""
+        try:
+            if chat is not None:
+                responses = await chat.send_message_stream(text)
+            else:
+                responses = await self.client.models.generate_content_stream(model=self.version, contents=[text])
+            async for response in responses:
+                if response.text:
+                    yield response.text
+        except Exception as e:
+            logger.error(f"Error streaming Gemini response: {e}")
+            raise
+
+    async def chat(self, stream=True):
         """Start an interactive chat session with Gemini."""
         try:
             # Create chat session
-            chat = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.chats.create(model=self.version)
-            )
+            chat = self.client.chats.create(model=self.version)
             
             console = _get_console()
             console.print("[bold green]🤖 Gemini Chat Session Started[/bold green]")
@@ -71,12 +107,16 @@ class AsyncGemini:
                         console.print("[yellow]Goodbye! 👋[/yellow]")
                         break
                     
+                    if stream:
+                        # Render the reply as it is generated; the chat session keeps the history
+                        console.print("[bold blue]Gemini:[/bold blue]")
+                        await render_markdown_stream(console, self.stream(prompt_text, chat))
+                        console.print("-" * 50)
+                        continue
+                    
                     # Send message to Gemini asynchronously
                     console.print("[dim]Thinking...[/dim]")
-                    response = await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: chat.send_message(prompt_text)
-                    )
+                    response = await chat.send_message(prompt_text)
                     
                     # Display response with rich markdown formatting
                     console.print("[bold blue]Gemini:[/bold blue]")
@@ -98,8 +138,10 @@ class AsyncGemini:
 
     @staticmethod
     def create_client(apikey, version="gemini-2.0-flash"):
-        """Create a global Gemini client instance."""
-        AsyncGemini.Client = AsyncGemini(apikey, version)
+        """Create a global Gemini client instance, reusing the pooled SDK client for the key."""
+        client = AsyncGemini.Client
+        if client is None or (client.apikey, client.version) != (apikey, version):
+            AsyncGemini.Client = AsyncGemini(apikey, version)
 
     @staticmethod
     def get_client():
@@ -113,8 +155,9 @@ class AsyncGemini:
 @click.option("--apikey", help="Gemini API key (or set in config GEMINI:apikey)")
 @click.option("--model", default="gemini-2.0-flash", help="Gemini model to use")
 @click.option("--prompt", help="Single prompt instead of interactive chat")
+@click.option("--stream/--no-stream", default=True, help="Render the reply as it is generated")
 @click.pass_context
-async def gemini(ctx, apikey, model, prompt):
+async def gemini(ctx, apikey, model, prompt, stream):
     """Chat with Gemini AI or send a single prompt."""
     
     console = _get_console()
@@ -142,6 +185,10 @@ async def gemini(ctx, apikey, model, prompt):
         if prompt:
             # Single prompt mode
             console.print(f"[bold cyan]🤖 Asking Gemini:[/bold cyan] {prompt}")
+            if stream:
+                console.print("[bold blue]Gemini:[/bold blue]")
+                await render_markdown_stream(console, client.stream(prompt))
+                return
             response = await client.request(prompt)
             console.print("[bold blue]Gemini:[/bold blue]")
             Markdown = _get_markdown()
@@ -149,8 +196,10 @@ async def gemini(ctx, apikey, model, prompt):
             console.print(md)
         else:
             # Interactive chat mode
-            await client.chat()
+            await client.chat(stream=stream)
             
     except Exception as e:
         console.print(f"[red]❌ Error: {e}[/red]")
-        logger.error(f"Gemini command error: {e}")
\ No newline at end of file
+        logger.error(f"Gemini command error: {e}")
+    finally:
+        await AsyncGemini.close_clients()
\ No newline at end of file
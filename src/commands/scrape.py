@@ -1,24 +1,95 @@
 """Web scraping commands with async support."""
 import asyncio
-from collections import deque
-from urllib.parse import urljoin, urlparse
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlparse
 import asyncclick as click
+from util.adaptive import AdaptiveConcurrency
+from util.linkparse import LinkExtractor, ParsePool, extract_links, extract_links_and_assets, is_html, \
+    parse_content_type
+from util.checkpoint import DEFAULT_KEEP_CRAWLS, CrawlCheckpoint, new_crawl_id, prune_crawls
+from util.config import CACHE_DIR
+from util.dedup import DEFAULT_DEDUP_DISTANCE, DEFAULT_DEDUP_ENTRIES, ContentIndex, content_digest, link_base, \
+    simhash
+from util.frontier import (
+    DEFAULT_FRONTIER_MEMORY, DEFAULT_VISITED_CAPACITY, BloomFilter, PriorityFrontier, SpillingQueue
+)
+from util.httpcache import DEFAULT_CACHE_FILE, DEFAULT_CACHE_MAX_BYTES, ValidatorCache
 from util.logging import logger
+from util.linkgraph import GRAPH_SUFFIX, LinkGraph
+from util.metrics import DEFAULT_METRICS_INTERVAL, METRICS_FORMATS, CrawlMetrics
+from util.politeness import PolitenessScheduler
+from util.resolver import DEFAULT_DNS_TTL, DEFAULT_NEGATIVE_TTL, CachingResolver
+from util.retry import DEFAULT_BACKOFF, DEFAULT_FAILURE_THRESHOLD, DEFAULT_MAX_DELAY, DEFAULT_RESET_TIMEOUT, \
+    DEFAULT_RETRIES, CircuitBreaker, RetryPolicy, status_of
+from util.results import OUTPUT_FORMATS, ResultWriter
+from util.scoring import PRIORITIES, FrontierScore, parse_boosts
+from util.urlfilter import REGEX_PREFIX, UrlFilter
+from util.urls import QUERY_POLICIES, canonicalize_url
+
+if TYPE_CHECKING:
+    from util.robots import RobotsCache
+    from util.sharding import ShardRouter
+    from util.warc import WarcWriter
+
+DEFAULT_MAX_BODY_BYTES = 5 * 1024 * 1024
+
+# Failed URLs kept for the summary; the rest are only counted
+MAX_FAILED_URLS = 1000
 
-def _get_console():
+# URLs set aside for a saturated host at any one time; past this, workers wait for the host's slot
+MAX_DEFERRED = 1000
+
+# Statuses some servers return for HEAD even though GET works
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+
+def _get_console(stderr: bool = False, quiet: bool = False):
     """Lazy import Console to improve startup time."""
     from rich.console import Console
-    return Console()
+    return Console(stderr=stderr, quiet=quiet)
 
 def _get_httpx():
     """Lazy import httpx to improve startup time."""
     import httpx
     return httpx
 
-def _get_bs4():
-    """Lazy import BeautifulSoup to improve startup time."""
-    from bs4 import BeautifulSoup
-    return BeautifulSoup
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _get_robots():
+    """Lazy import robots.txt and sitemap support to improve startup time."""
+    from util import robots
+    return robots
+
+def _get_sharding():
+    """Lazy import shard coordination to improve startup time."""
+    from util import sharding
+    return sharding
+
+def _get_warc():
+    """Lazy import the WARC writer to improve startup time."""
+    from util import warc
+    return warc
+
+def _get_crawldiff():
+    """Lazy import crawl diffing to improve startup time."""
+    from util import crawldiff
+    return crawldiff
+
+def _get_proxies() -> dict:
+    """Lazy import urllib.request, which is slow to load, to read the environment's proxies."""
+    from urllib.request import getproxies
+    return getproxies()
 
 def _get_rich_components():
     """Lazy import rich components to improve startup time."""
@@ -26,34 +97,162 @@ def _get_rich_components():
     from rich.table import Table
     return Progress, TaskID, Table
 
-async def fetch_links(url: str, client) -> list[str]:
+class CrawlItem(NamedTuple):
+    """A URL waiting in the frontier."""
+    url: str  # as discovered, which is what gets fetched; the canonical form is only the seen key
+    depth: int
+    check: bool = False  # only verify the URL is alive, don't download it
+    source: str | None = None  # page the URL was found on
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of fetching once the crawl's page or time budget is used up."""
+
+
+@dataclass
+class FetchResult:
+    """Outcome of fetching a single page."""
+    status: int
+    links: list[str] = field(default_factory=list)
+    assets: list[str] = field(default_factory=list)
+    bytes: int = 0
+    parse_time: float = 0.0  # seconds spent extracting links
+    duplicate: str | None = None  # "exact" or "near" when links were reused from a matching page
+
+
+async def fetch_links(url: str, client, max_bytes: int = DEFAULT_MAX_BODY_BYTES, parse_pool=None,
+                      cache=None) -> list[str]:
     """
     Fetches all the links (href attributes of <a> tags) from a given webpage URL asynchronously.
 
+    See `fetch_page` for the details; this returns only the links.
+    """
+    result = await fetch_page(url, client, max_bytes, parse_pool, cache)
+    return result.links
+
+
+async def fetch_page(url: str, client, max_bytes: int = DEFAULT_MAX_BODY_BYTES, parse_pool=None,
+                     cache=None, assets: bool = False, trace=None, dedup=None, warc=None,
+                     cache_key: str | None = None) -> FetchResult:
+    """
+    Fetches a webpage and extracts its links (href attributes of <a> tags) asynchronously.
+
+    The body is streamed through an incremental tokenizer, so links are collected
+    as chunks arrive and no DOM is built. Responses that are not HTML are never
+    read, and reading stops once `max_bytes` of body have been consumed. When a
+    parse pool is given the body is buffered and parsed in a worker process instead.
+    When a validator cache is given the request is made conditional, and the cached
+    links are returned on a 304. With `assets` set, the URLs of `img`, `script`
+    and `link` assets on the page are collected too. A `trace` callback is
+    passed to httpx to time the connection and response phases. When a content
+    index is given the body is buffered and fingerprinted, and a page whose
+    content matches one seen before reuses its links instead of being parsed.
+    When a WARC writer is given the body is buffered and the same buffer is
+    handed to the writer, which archives the exchange in the background.
+
     Args:
         url (str): The URL of the webpage to scrape.
         client: The HTTP client to use.
+        max_bytes (int): Maximum number of body bytes to read (0 for no limit).
+        parse_pool (ParsePool): Optional process pool to parse the body in.
+        cache (ValidatorCache): Optional cache of ETag / Last-Modified validators.
+        assets (bool): Whether to collect asset URLs as well.
+        trace: Optional httpx trace extension callback.
+        dedup (ContentIndex): Optional index of content fingerprints to reuse links from.
+        warc (WarcWriter): Optional writer to archive HTML responses to.
+        cache_key (str): The URL's canonical form, which the validator cache is keyed by
+                         (defaults to `url`).
 
     Returns:
-        list: A list of strings, where each string is a link found on the page.
-              Returns an empty list if the request fails or no links are found.
+        FetchResult: The status, links, assets, number of body bytes read, parse time
+                     and whether the page duplicated one seen before.
+                     Links are empty if the page is not HTML or has none.
     """
+    httpx = _get_httpx()
+    cache_key = cache_key or url
+    cached = await cache.get(cache_key) if cache is not None else None
+    if cached is not None and assets and cached.assets is None:
+        # The cached entry predates asset collection, so it can't answer for them
+        cached = None
+    headers = cached.conditional_headers() if cached is not None else {}
+    extensions = {"trace": trace} if trace is not None else None
     try:
-        response = await client.get(url, timeout=30.0)
-        response.raise_for_status()
-        
-        BeautifulSoup = _get_bs4()
-        soup = BeautifulSoup(response.content, "html.parser")
-        links = []
+        async with client.stream("GET", url, headers=headers, timeout=30.0, extensions=extensions) as response:
+            if cached is not None and response.status_code == 304:
+                logger.debug(f"Not modified, reusing {len(cached.links)} cached links for {url}")
+                cache.touch(cache_key)
+                return FetchResult(304, cached.links, (cached.assets or []) if assets else [])
+            response.raise_for_status()
+            
+            etag = response.headers.get("etag")
+            last_modified = response.headers.get("last-modified")
+            content_type = response.headers.get("content-type")
+            if not is_html(content_type):
+                logger.debug(f"Skipping body of {url} ({content_type})")
+                if cache is not None and (etag or last_modified):
+                    cache.put(cache_key, etag, last_modified, [], [])
+                return FetchResult(response.status_code)
+            
+            _, charset = parse_content_type(content_type)
+            # Relative links resolve against where the page actually is, after any redirects
+            base = str(response.url)
+            buffered = parse_pool is not None or dedup is not None or warc is not None
+            if buffered:
+                body = bytearray()
+                feed = body.extend
+            else:
+                extractor = LinkExtractor(base, charset, assets=assets)
+                links = []
+                feed = lambda chunk: links.extend(extractor.feed_bytes(chunk))
+            received = 0
+            parse_time = 0.0
+            truncated = False
+            
+            async for chunk in response.aiter_bytes():
+                if max_bytes and received + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - received]
+                    truncated = True
+                    logger.debug(f"Body of {url} exceeds {max_bytes} bytes, truncating")
+                received += len(chunk)
+                tick = time.perf_counter()
+                feed(chunk)
+                parse_time += time.perf_counter() - tick
+                if max_bytes and received >= max_bytes:
+                    break
+            
+        if warc is not None:
+            await warc.write(response, body, truncated)
+        tick = time.perf_counter()
+        duplicate = None
+        if dedup is not None:
+            body = bytes(body)
+            digest, fingerprint = content_digest(body), simhash(body)
+            match = dedup.lookup(digest, fingerprint, assets, link_base(base))
+            if match is not None:
+                duplicate, links, page_assets = match[0], match[1], match[2] or []
+                logger.debug(f"Content of {url} is a{'n exact' if duplicate == 'exact' else ' near'} "
+                             f"duplicate, reusing {len(links)} links")
+        if duplicate is None:
+            if parse_pool is not None:
+                links, page_assets = await parse_pool.extract(bytes(body), base, charset, assets)
+            elif buffered:
+                if assets:
+                    links, page_assets = extract_links_and_assets(body, base, charset)
+                else:
+                    links, page_assets = extract_links(body, base, charset), []
+            else:
+                links.extend(extractor.finish())
+                page_assets = extractor.assets
+            if dedup is not None:
+                dedup.add(digest, fingerprint, links, page_assets if assets else None, link_base(base))
+        parse_time += time.perf_counter() - tick
         
-        for link_tag in soup.find_all("a", href=True):
-            href = link_tag["href"]
-            # Convert relative URLs to absolute URLs
-            absolute_url = urljoin(url, href)
-            links.append(absolute_url)
+        if cache is not None and (etag or last_modified):
+            # Assets that weren't collected are cached as unknown rather than empty
+            cache.put(cache_key, etag, last_modified, links, page_assets if assets else None)
             
         logger.debug(f"Found {len(links)} links on {url}")
-        return links
+        return FetchResult(response.status_code, links, page_assets, received, parse_time, duplicate)
         
     except httpx.RequestError as e:
         logger.error(f"Request error fetching {url}: {e}")
@@ -63,149 +262,771 @@ async def fetch_links(url: str, client) -> list[str]:
         raise
 
 
+async def check_link(url: str, client, trace=None) -> int:
+    """
+    Checks that a URL is alive without downloading or parsing its body.
+
+    Sends a HEAD request, falling back to a single-byte ranged GET for servers
+    that reject HEAD. The ranged response is never read.
+
+    Args:
+        url (str): The URL to check.
+        client: The HTTP client to use.
+        trace: Optional httpx trace extension callback.
+
+    Returns:
+        int: The final HTTP status code. Raises on network errors and 4xx/5xx statuses.
+    """
+    httpx = _get_httpx()
+    extensions = {"trace": trace} if trace is not None else None
+    try:
+        response = await client.head(url, timeout=30.0, extensions=extensions)
+        if response.status_code in HEAD_FALLBACK_STATUSES:
+            logger.debug(f"HEAD rejected with {response.status_code} for {url}, retrying with ranged GET")
+            async with client.stream("GET", url, headers={"Range": "bytes=0-0"}, timeout=30.0,
+                                     extensions=extensions) as response:
+                pass
+        response.raise_for_status()
+        return response.status_code
+        
+    except httpx.RequestError as e:
+        logger.error(f"Request error checking {url}: {e}")
+        raise
+
+
 class AsyncScraper:
     """Async web scraper with breadth-first crawling."""
     
-    def __init__(self, start_url: str, max_depth: int = 0, stay_in_domain: bool = True, max_concurrent: int = 5):
-        self.start_url = start_url
+    def __init__(self, start_url: str, max_depth: int = 0, stay_in_domain: bool = True, max_concurrent: int = 5,
+                 query_policy: str = "keep", politeness: PolitenessScheduler | None = None,
+                 http2: bool = False, max_keepalive: int | None = None,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, parse_workers: int = 0,
+                 cache: ValidatorCache | None = None, checkpoint: CrawlCheckpoint | None = None,
+                 check_only: bool = False, writer: ResultWriter | None = None,
+                 shard: "ShardRouter | None" = None, robots: "RobotsCache | None" = None,
+                 obey_robots: bool = True, sitemaps: bool = False, metrics_file: str | None = None,
+                 metrics_format: str = "json", metrics_interval: float = DEFAULT_METRICS_INTERVAL,
+                 adaptive: AdaptiveConcurrency | None = None, frontier_memory: int = DEFAULT_FRONTIER_MEMORY,
+                 visited_fpr: float | None = None, visited_capacity: int = DEFAULT_VISITED_CAPACITY,
+                 dedup: ContentIndex | None = None, retry: RetryPolicy | None = None,
+                 breaker: CircuitBreaker | None = None, resolver: CachingResolver | None = None,
+                 graph: LinkGraph | None = None, graph_file: str | Path | None = None,
+                 priority: str = "fifo", boosts: list | None = None, max_pages: int | None = None,
+                 time_budget: float | None = None, warc: "WarcWriter | None" = None,
+                 url_filter: UrlFilter | None = None):
+        self.query_policy = query_policy
+        self.politeness = politeness or PolitenessScheduler()
+        self.http2 = http2
+        self.max_keepalive = max_keepalive if max_keepalive is not None else max_concurrent
+        self.max_body_bytes = max_body_bytes
+        self.parse_workers = parse_workers
+        self.parse_pool = None
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.check_only = check_only
+        self.writer = writer
+        self.shard = shard
+        self.robots = robots
+        self.obey_robots = obey_robots and robots is not None
+        self.sitemaps = sitemaps and robots is not None
+        self.adaptive = adaptive
+        self.dedup = dedup
+        self.retry = retry
+        self.breaker = breaker
+        self.resolver = resolver
+        self.graph = graph
+        self.graph_file = graph_file
+        self.warc = warc
+        self.url_filter = url_filter
+        self.filtered = 0  # links skipped by the include/exclude filters
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.pages_started = 0  # page fetches counted against max_pages
+        self.stop_reason = None  # set once a budget stops the crawl
+        self.abandoned = 0  # urls taken from the frontier but dropped because the budget ran out
+        self.deferred = 0  # urls set aside until their host has a free slot
+        self._stopping = asyncio.Event()
+        self.retries = 0  # extra attempts made after transient failures
+        self.metrics = CrawlMetrics()
+        self.metrics_file = metrics_file
+        self.metrics_format = metrics_format
+        self.metrics_interval = metrics_interval
+        self.seeding = False
+        self.seeded = 0  # urls enqueued from sitemaps
+        self.disallowed = 0  # urls skipped because of robots.txt
+        self.console = _get_console(stderr=writer is not None and writer.to_stdout)
+        self.checked = 0  # urls verified without downloading the body
+        self.start_url = canonicalize_url(start_url, query_policy) or start_url
         self.max_depth = max_depth
         self.stay_in_domain = stay_in_domain
         self.max_concurrent = max_concurrent
         
         # Parse the starting domain
-        self.start_domain = urlparse(start_url).netloc
+        self.start_domain = urlparse(self.start_url).netloc
         
-        # Work tracking
-        self.work_queue = deque()
-        self.completed = {}  # url -> success status
-        self.failed_urls = []
+        # Work tracking, keyed by canonical URL. The frontier spills to disk past
+        # `frontier_memory` entries, and with `visited_fpr` the seen set becomes a
+        # Bloom filter, so memory stays flat however many URLs the crawl finds.
+        # Any order other than plain FIFO goes through a heap of scored entries
+        self.priority = "depth" if priority == "fifo" and boosts else priority
+        if self.priority == "fifo":
+            self.work_queue = SpillingQueue(frontier_memory, item_type=CrawlItem)
+        else:
+            score = FrontierScore(self.start_domain, same_domain=self.priority == "same-domain", boosts=boosts or ())
+            self.work_queue = PriorityFrontier(score, frontier_memory, item_type=CrawlItem)
+        # every url ever enqueued
+        self.seen = BloomFilter(visited_capacity, visited_fpr) if visited_fpr else set()
+        self.processed = 0
+        self.successful = 0
+        self.failed = 0
+        self.failed_urls = []  # the first MAX_FAILED_URLS failures
+        self.in_flight = 0
+        if graph is not None:
+            graph.add_root(self.start_url)
         
-        # Add starting URL
-        self.work_queue.append((self.start_url, 0))
+        if checkpoint is not None and checkpoint.resumed:
+            self.restore()
+        else:
+            # Add starting URL, fetched as given
+            self.enqueue(start_url, 0)
+
+    def restore(self):
+        """Rebuild the visited set and frontier from the checkpoint."""
+        for url, success in self.checkpoint.visited():
+            self.seen.add(url)
+            self.record_outcome(url, success)
+        for item in self.checkpoint.frontier():
+            item = CrawlItem(*item)
+            key = self.canonicalize(item.url) or item.url
+            if key not in self.seen:
+                self.seen.add(key)
+                self.work_queue.put_nowait(item)
+        logger.debug(f"Restored {self.processed} visited and {self.work_queue.qsize()} queued URLs")
+
+    def record_outcome(self, url: str, success: bool):
+        """Count a fetched URL, keeping the first failures for the summary."""
+        self.processed += 1
+        if success:
+            self.successful += 1
+            return
+        self.failed += 1
+        if len(self.failed_urls) < MAX_FAILED_URLS:
+            self.failed_urls.append(url)
+
+    def canonicalize(self, url: str) -> str | None:
+        """Return the frontier key for a URL, or None if it can't be crawled."""
+        return canonicalize_url(url, self.query_policy)
+
+    def enqueue(self, url: str, depth: int, check: bool = False, source: str | None = None) -> bool:
+        """Add a URL to the work queue unless it was already seen; `check` URLs are only verified."""
+        key = self.canonicalize(url)
+        if key is None:
+            return False
+        return self._admit(key, url, depth, check, source)
+
+    def _admit(self, key: str, url: str, depth: int, check: bool = False, source: str | None = None) -> bool:
+        """`enqueue` for a URL whose canonical form `key` is already known."""
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        item = CrawlItem(url.split("#", 1)[0], depth, check, source)
+        if self.shard is not None and not self.shard.owns(key):
+            # Another shard fetches this host; hand the entry over instead
+            self.shard.forward(item, key)
+            return False
+        self.work_queue.put_nowait(item)
+        if self.checkpoint is not None:
+            self.checkpoint.record_enqueued(*item)
+        if self.resolver is not None:
+            # Resolve the host while the URL waits in the frontier
+            parts = urlparse(key)
+            self.resolver.prefetch(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        return True
+
+    @property
+    def idle(self) -> bool:
+        """Whether the frontier is empty and no URL is being processed."""
+        return self.work_queue.empty() and self.in_flight == 0 and self.deferred == 0 and not self.seeding
+
+    async def seed_from_sitemaps(self, client):
+        """Bulk-enqueue the pages listed in the start host's sitemaps."""
+        self.seeding = True
+        try:
+            async for page in self.robots.sitemap_pages(self.start_url, client):
+                if self.should_process_url(page):
+                    self.seeded += self.enqueue(page, 0)
+        except Exception as e:
+            logger.error(f"Failed to seed from sitemaps: {e}")
+        finally:
+            self.seeding = False
+        logger.debug(f"Seeded {self.seeded} URLs from sitemaps")
+
+    def schedule(self, links: list[str], assets: list[str], depth: int, source: str | None = None) -> list[str]:
+        """Enqueue the links and assets found on the page `source` at `depth` and return them canonicalized."""
+        # Links one level down would be skipped as too deep, so they are leaves
+        leaf = self.max_depth > 0 and depth + 1 >= self.max_depth
+        links = [(self.canonicalize(link), link) for link in links]
+        assets = [(self.canonicalize(asset), asset) for asset in assets]
+        if self.graph is not None and source is not None:
+            self.graph.add_links(self.canonicalize(source) or source, [key for key, _ in links + assets])
+        crawled = 0
+        # (key, url, check): leaf and external links and assets are only checked
+        candidates = [(key, link, leaf or not self._in_scope(key)) for key, link in links if key is not None]
+        candidates += [(key, asset, True) for key, asset in assets if key is not None]
+        for key, url, check in candidates:
+            if check and not self.check_only:
+                continue
+            # Filters see the URL as found, so query parameters dropped from the key still match
+            if self.url_filter and not self.url_filter(url):
+                # Pruned before it reaches the frontier, so it is never fetched or checked
+                self.filtered += 1
+                continue
+            admitted = self._admit(key, url, depth + 1, check=check, source=source)
+            if not check:
+                crawled += admitted
+        logger.debug(f"Scheduled {crawled} of {len(links)} links for crawling")
+        return [key for key, _ in links + assets if key is not None]
 
     def should_process_url(self, url: str) -> bool:
-        """Check if URL should be processed based on domain restrictions."""
+        """Check if URL should be processed based on domain restrictions and include/exclude filters."""
+        if not self._in_scope(self.canonicalize(url) or url):
+            return False
+        if self.url_filter and not self.url_filter(url):
+            self.filtered += 1
+            return False
+        return True
+
+    def _in_scope(self, url: str) -> bool:
         if not self.stay_in_domain:
             return True
-        
-        parsed_url = urlparse(url)
-        return parsed_url.netloc == self.start_domain or parsed_url.netloc == ""
+        # Canonical URLs are always "scheme://netloc/...", so the host is the third "/" field
+        netloc = url.split("/", 3)[2] if "://" in url else urlparse(url).netloc
+        return netloc == self.start_domain or netloc == ""
 
-    async def process_url(self, client, url: str, depth: int) -> tuple[str, bool, list[str]]:
-        """Process a single URL and return its links."""
-        if url in self.completed:
-            logger.debug(f"Already processed: {url}")
-            return url, True, []
-        
-        if self.max_depth > 0 and depth >= self.max_depth:
+    async def process_url(self, client, url: str, depth: int, check: bool = False,
+                          source: str | None = None) -> tuple[str, bool | None, int | None, list[str], list[str]]:
+        """
+        Process a single URL and return its status, links and assets; `check` only verifies it is alive.
+
+        The URL is fetched as discovered and the result is returned and recorded
+        under its canonical form. Success is None when the URL was skipped without
+        being fetched. Every URL reaches this at most once, since the frontier
+        only admits unseen URLs.
+        """
+        key = self.canonicalize(url) or url
+        if not check and self.max_depth > 0 and depth >= self.max_depth:
             logger.debug(f"Max depth reached for: {url}")
-            return url, True, []
+            return key, None, None, [], []
         
+        if not check and self.obey_robots and not await self.robots.allowed(url, client):
+            logger.debug(f"Disallowed by robots.txt: {url}")
+            self.disallowed += 1
+            return key, None, None, [], []
+        
+        if self.stop_reason is not None:
+            raise BudgetExhausted(self.stop_reason)
+        if not check and self.max_pages is not None:
+            if self.pages_started >= self.max_pages:
+                self.stop(f"reached --max-pages {self.max_pages}")
+                raise BudgetExhausted(self.stop_reason)
+            self.pages_started += 1
+        
+        started = None
+        host = urlparse(url).netloc
+        if check:
+            self.checked += 1
+        attempt = 0
         try:
-            links = await fetch_links(url, client)
-            self.completed[url] = True
-            
-            # Filter links based on domain restrictions
-            if self.stay_in_domain:
-                valid_links = [link for link in links if self.should_process_url(link)]
-                logger.debug(f"Filtered {len(links)} -> {len(valid_links)} links for domain {self.start_domain}")
-                return url, True, valid_links
-            else:
-                return url, True, links
+            while True:
+                if self.breaker is not None:
+                    # Fails fast without taking a slot while the host's circuit is open
+                    self.breaker.check(url)
+                waiting = time.monotonic()
+                try:
+                    async with self.politeness.slot(url), \
+                            self.adaptive.slot(url) if self.adaptive is not None else nullcontext():
+                        started = time.monotonic()
+                        # Time spent queued behind per-host and adaptive limits shows when they are the bottleneck
+                        self.metrics.observe("wait", started - waiting)
+                        trace = self.metrics.tracer()
+                        if check:
+                            result = FetchResult(await check_link(url, client, trace=trace))
+                        else:
+                            result = await fetch_page(url, client, self.max_body_bytes, self.parse_pool,
+                                                      self.cache, assets=self.check_only, trace=trace,
+                                                      dedup=self.dedup, warc=self.warc, cache_key=key)
+                except Exception as e:
+                    if self.breaker is not None:
+                        self.breaker.record(url, e)
+                    delay = self.retry.delay(e, attempt) if self.retry is not None else None
+                    if delay is None:
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    # Back off outside the politeness and adaptive slots so other URLs can use them
+                    logger.debug(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}) after: {e}")
+                    await asyncio.sleep(delay)
+                    continue
+                if self.breaker is not None:
+                    self.breaker.record(url)
+                break
+            self.record_outcome(url, True)
+            if self.graph is not None:
+                self.graph.mark(key, True, result.status)
+            self.metrics.record(host, True, result.bytes, time.monotonic() - started, result.parse_time)
+            await self.emit(url, source, depth, started, result.status, result.bytes)
+            return key, True, result.status, result.links, result.assets
                 
         except Exception as e:
             logger.error(f"Failed to process {url}: {e}")
-            self.completed[url] = False
-            self.failed_urls.append(url)
-            return url, False, []
+            self.record_outcome(url, False)
+            self.metrics.record(host, False, 0, time.monotonic() - started if started is not None else None)
+            status = status_of(e)
+            if self.graph is not None:
+                self.graph.mark(key, False, status)
+            error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            await self.emit(url, source, depth, started, status, 0, error)
+            return key, False, status, [], []
+
+    async def emit(self, url: str, source: str | None, depth: int, started: float | None,
+                   status: int | None, size: int, error: str | None = None):
+        """Hand a per-URL record to the result writer, if one is configured."""
+        if self.writer is None:
+            return
+        await self.writer.write({
+            "url": url,
+            "source": source,
+            "depth": depth,
+            "status": status,
+            "ok": error is None,
+            "latency": round(time.monotonic() - started, 4) if started is not None else None,
+            "bytes": size,
+            "error": error,
+        })
+
+    async def crawl(self, client):
+        """Seed the frontier and return once the whole crawl is finished."""
+        if self.sitemaps and (self.shard is None or self.shard.owns(self.start_url)):
+            # Workers are already draining the frontier while seeds stream in
+            await self.seed_from_sitemaps(client)
+        if self.shard is not None:
+            # Returns once every shard is idle with no entries in transit
+            await self.shard.run(self)
+        else:
+            # Returns once the queue is drained and every worker is idle
+            await self.work_queue.join()
+
+    def stop(self, reason: str):
+        """Stop handing out work once a budget is used up; fetches in flight still finish."""
+        if self.stop_reason is None:
+            self.stop_reason = reason
+            logger.info(f"Stopping crawl: {reason}")
+            self._stopping.set()
+
+    def _requeue(self, item: CrawlItem):
+        """Put a deferred URL back in the frontier once its host can take it."""
+        self.deferred -= 1
+        if self.stop_reason is None:
+            self.work_queue.put_nowait(item)
+        else:
+            self.abandoned += 1
+        # Only now, so the queue never looks finished while the URL is set aside
+        self.work_queue.task_done()
+
+    def _writer_done(self, name: str, task: asyncio.Task):
+        """Stop the crawl if a background writer died, instead of fetching pages it can't record."""
+        if not task.cancelled() and task.exception() is not None:
+            self.stop(f"{name} failed: {task.exception()}")
+
+    async def worker(self, client, progress, task):
+        """Pull URLs from the work queue until cancelled or the crawl is stopped."""
+        while self.stop_reason is None:
+            item = await self.work_queue.get()
+            url, depth, check, source = item
+            if self.deferred < MAX_DEFERRED and self.politeness.defer(url, lambda item=item: self._requeue(item)):
+                # Take other hosts' URLs instead of waiting behind this host's limits
+                self.deferred += 1
+                continue
+            self.in_flight += 1
+            try:
+                key, success, status, new_links, assets = await self.process_url(client, url, depth, check, source)
+                targets = None
+                if success:
+                    # Add new URLs to queue with incremented depth
+                    targets = self.schedule(new_links, assets, depth, source=url)
+                if self.checkpoint is not None:
+                    # The link digest lets `util scrape diff` spot pages whose links changed
+                    digest = _get_crawldiff().links_digest(targets) if targets is not None else None
+                    self.checkpoint.record_done(key, success, status, digest, queued=url)
+            except BudgetExhausted:
+                # Left unfinished in the checkpoint, so a resumed crawl picks it up
+                self.abandoned += 1
+            except Exception as e:
+                logger.error(f"Task failed: {e}")
+            finally:
+                self.in_flight -= 1
+                # A URL that never took its host's slot (robots, depth, budget) must still hand it on
+                self.politeness.wake(url)
+                progress.update(task, completed=self.processed)
+                self.work_queue.task_done()
 
     async def run(self):
         """Run the async scraper."""
-        console = _get_console()
+        console = self.console
         console.print(f"[bold green]🕷️  Starting async scrape of {self.start_url}[/bold green]")
         console.print(f"Max depth: {self.max_depth if self.max_depth > 0 else 'unlimited'}")
         console.print(f"Stay in domain: {self.stay_in_domain}")
-        console.print(f"Max concurrent requests: {self.max_concurrent}")
+        console.print(f"Honor robots.txt: {self.obey_robots}, seed from sitemaps: {self.sitemaps}")
+        if self.url_filter:
+            console.print(f"URL filters: {self.url_filter.describe()}")
+        if self.shard is not None:
+            console.print(f"Shard: {self.shard.index + 1} of {self.shard.shards} ({self.shard.directory})")
+        if self.check_only:
+            console.print("Check only: leaf, external and asset links are verified with HEAD")
+        console.print(f"Max concurrent requests: {self.max_concurrent}"
+                      f"{' (adaptive)' if self.adaptive is not None else ''}")
+        limits = self.politeness.default
+        console.print(f"Per-host concurrency: {limits.concurrency or 'unlimited'}, "
+                      f"rate: {f'{limits.rps:g}/s' if limits.rps else 'unlimited'}")
+        if self.parse_workers > 0:
+            console.print(f"Parse workers: {self.parse_workers}")
+        visited = (f"Bloom filter, {self.seen.capacity} URLs at {self.seen.fpr:g} false positives "
+                   f"({self.seen.size_bytes / 1_048_576:.1f} MiB)" if isinstance(self.seen, BloomFilter) else "exact")
+        console.print(f"Frontier in memory: {self.work_queue.memory_items} entries, visited set: {visited}")
+        budgets = [f"{self.max_pages} pages" if self.max_pages is not None else None,
+                   f"{self.time_budget:g}s" if self.time_budget is not None else None]
+        console.print(f"Frontier order: {self.priority}, budget: {', '.join(filter(None, budgets)) or 'none'}")
+        retries = self.retry.retries if self.retry is not None else 0
+        breaker = (f"after {self.breaker.threshold} host failures, probing every {self.breaker.reset_timeout:g}s"
+                   if self.breaker is not None else "disabled")
+        console.print(f"Retries: {retries}, circuit breaker: {breaker}")
+        if self.dedup is not None:
+            console.print(f"Duplicate detection: SimHash within {self.dedup.distance} bits, "
+                          f"last {self.dedup.max_entries} pages")
+        console.print(f"Validator cache: {self.cache.path if self.cache is not None else 'disabled'}")
+        if self.resolver is not None and _get_proxies():
+            console.print("[yellow]⚠️  Proxy configured in the environment, leaving DNS to the proxy[/yellow]")
+            self.resolver = None
+        if self.resolver is not None:
+            self.resolver.metrics = self.metrics
+            console.print(f"DNS cache: {self.resolver.backend}, {self.resolver.ttl:g}s default TTL, "
+                          f"failures kept {self.resolver.negative_ttl:g}s")
+        if self.graph is not None:
+            console.print(f"Link graph: {self.graph_file}")
+        if self.warc is not None:
+            console.print(f"WARC archive: {self.warc.pattern} (new file every "
+                          f"{self.warc.max_bytes / 1_048_576:g} MiB)")
+        if self.metrics_file is not None:
+            console.print(f"Metrics: {self.metrics_file} ({self.metrics_format}, every {self.metrics_interval:g}s)")
+        if self.checkpoint is not None:
+            verb = "Resuming" if self.checkpoint.resumed else "Crawl id"
+            console.print(f"{verb}: {self.checkpoint.crawl_id} "
+                          f"(continue with [bold]util scrape --resume {self.checkpoint.crawl_id}[/bold])")
         console.print("-" * 60)
         
         httpx = _get_httpx()
         Progress, TaskID, Table = _get_rich_components()
         
         timeout = httpx.Timeout(30.0, connect=10.0)
+        # Never open more connections than there are workers, and keep them alive for reuse
+        pool_limits = httpx.Limits(
+            max_connections=self.max_concurrent,
+            max_keepalive_connections=self.max_keepalive,
+        )
+        http2 = self.http2
+        if http2 and not _http2_available():
+            console.print("[yellow]⚠️  HTTP/2 requested but the h2 package is not installed, using HTTP/1.1[/yellow]")
+            http2 = False
         
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            with Progress() as progress:
-                task = progress.add_task("[cyan]Scraping...", total=None)
-                
-                while self.work_queue:
-                    # Get batch of URLs to process
-                    current_batch = []
-                    for _ in range(min(self.max_concurrent, len(self.work_queue))):
-                        if self.work_queue:
-                            current_batch.append(self.work_queue.popleft())
+        if self.parse_workers > 0:
+            self.parse_pool = ParsePool(self.parse_workers)
+        flusher = None
+        if self.checkpoint is not None:
+            flusher = asyncio.create_task(self.checkpoint.run())
+        cache_flusher = None
+        if self.cache is not None:
+            cache_flusher = asyncio.create_task(self.cache.run())
+        writer_task = None
+        if self.writer is not None:
+            writer_task = asyncio.create_task(self.writer.run())
+            writer_task.add_done_callback(lambda done: self._writer_done("Result writer", done))
+        warc_task = None
+        if self.warc is not None:
+            warc_task = asyncio.create_task(self.warc.run())
+            warc_task.add_done_callback(lambda done: self._writer_done("WARC writer", done))
+        
+        if self.resolver is not None:
+            transport = self.resolver.transport(pool_limits, http2=http2)
+        else:
+            transport = httpx.AsyncHTTPTransport(limits=pool_limits, http2=http2)
+        
+        try:
+            async with httpx.AsyncClient(timeout=timeout, follow_redirects=True, transport=transport) as client:
+                with Progress(console=console) as progress:
+                    task = progress.add_task("[cyan]Scraping...", total=None)
                     
-                    if not current_batch:
-                        break
+                    def refresh(metrics):
+                        metrics.set_gauge("frontier_depth", self.work_queue.qsize())
+                        metrics.set_gauge("in_flight", self.in_flight)
+                        description = f"[cyan]Scraping[/cyan] {metrics.live_summary()}"
+                        if self.adaptive is not None:
+                            metrics.set_gauge("concurrency_limit", self.adaptive.overall.current)
+                            description += f" · {self.adaptive.describe()}"
+                        progress.update(task, description=description)
                     
-                    # Process batch concurrently
-                    tasks = [
-                        self.process_url(client, url, depth) 
-                        for url, depth in current_batch
+                    reporter = asyncio.create_task(self.metrics.run(
+                        refresh, self.metrics_file, self.metrics_format, self.metrics_interval
+                    ))
+                    # Long-lived workers start a new fetch as soon as any slot frees up
+                    workers = [
+                        asyncio.create_task(self.worker(client, progress, task))
+                        for _ in range(self.max_concurrent)
                     ]
-                    
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    
-                    # Process results and add new URLs to queue
-                    for result in results:
-                        if isinstance(result, Exception):
-                            logger.error(f"Task failed: {result}")
-                            continue
-                            
-                        url, success, new_links = result
-                        
-                        if success and new_links:
-                            # Add new URLs to queue with incremented depth
-                            current_depth = next((depth for u, depth in current_batch if u == url), 0)
-                            for link in new_links:
-                                if (link not in self.completed and 
-                                    not any(link == queued_url for queued_url, _ in self.work_queue) and
-                                    link != "#"):
-                                    self.work_queue.append((link, current_depth + 1))
-                    
-                    progress.update(task, completed=len(self.completed))
+                    budget_timer = None
+                    if self.time_budget is not None:
+                        budget_timer = asyncio.get_running_loop().call_later(
+                            self.time_budget, self.stop, f"reached --time-budget {self.time_budget:g}s"
+                        )
+                    crawl = asyncio.create_task(self.crawl(client))
+                    stopping = asyncio.create_task(self._stopping.wait())
+                    try:
+                        await asyncio.wait({crawl, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                        if crawl.done():
+                            crawl.result()
+                        else:
+                            crawl.cancel()
+                            await asyncio.gather(crawl, return_exceptions=True)
+                            # Let fetches already under way finish so their results are kept
+                            while self.in_flight:
+                                await asyncio.sleep(0.05)
+                    finally:
+                        if budget_timer is not None:
+                            budget_timer.cancel()
+                        for waiter in (crawl, stopping):
+                            waiter.cancel()
+                        for worker in workers:
+                            worker.cancel()
+                        await asyncio.gather(*workers, return_exceptions=True)
+                        reporter.cancel()
+                        await asyncio.gather(reporter, return_exceptions=True)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown()
+                self.parse_pool = None
+            if cache_flusher is not None:
+                cache_flusher.cancel()
+                await asyncio.gather(cache_flusher, return_exceptions=True)
+                await self.cache.close()
+            if self.robots is not None:
+                self.robots.close()
+            self.work_queue.close()
+            if self.resolver is not None:
+                await self.resolver.close()
+            writer_errors = []
+            if writer_task is not None:
+                # Let the writer drain what is queued so partial results are never lost
+                await self.writer.close()
+                writer_errors += await asyncio.gather(writer_task, return_exceptions=True)
+            if warc_task is not None:
+                await self.warc.close()
+                writer_errors += await asyncio.gather(warc_task, return_exceptions=True)
+            if flusher is not None:
+                flusher.cancel()
+                await asyncio.gather(flusher, return_exceptions=True)
+                await self.checkpoint.close()
+            if self.graph is not None:
+                await asyncio.to_thread(self.graph.save, self.graph_file)
+                console.print(f"Link graph: {len(self.graph)} URLs, {self.graph.edges} edges "
+                              f"({self.graph.size_bytes / 1_048_576:.1f} MiB) saved to {self.graph_file}")
+        for error in writer_errors:
+            if error is not None:
+                raise error
         
         # Display results
         await self.display_results()
 
+    def summary(self) -> dict:
+        """Return the crawl's counts and failed URLs."""
+        summary = {
+            "processed": self.processed,
+            "successful": self.successful,
+            "failed": self.failed,
+        }
+        if self.check_only:
+            summary["checked"] = self.checked
+        if self.sitemaps:
+            summary["seeded"] = self.seeded
+        if self.obey_robots:
+            summary["disallowed"] = self.disallowed
+        if self.url_filter:
+            summary["filtered"] = self.filtered
+        if self.cache is not None:
+            summary["not_modified"] = self.cache.hits
+        if self.writer is not None:
+            summary["records"] = self.writer.written
+        if self.warc is not None:
+            summary["archived"] = self.warc.written
+        if self.retry is not None:
+            summary["retries"] = self.retries
+        if self.breaker is not None:
+            summary["fast_failed"] = self.breaker.fast_failed
+        if self.dedup is not None:
+            summary["exact_duplicates"] = self.dedup.exact
+            summary["near_duplicates"] = self.dedup.near
+        if self.resolver is not None:
+            summary["dns_lookups"] = self.resolver.lookups
+            summary["dns_cache_hits"] = self.resolver.hits
+        if self.stop_reason is not None:
+            summary["unfetched"] = self.work_queue.qsize() + self.abandoned + self.deferred
+        if self.work_queue.spilled_total:
+            summary["spilled"] = self.work_queue.spilled_total
+        summary["failed_urls"] = self.failed_urls
+        return summary
+
     async def display_results(self):
         """Display scraping results."""
-        console.print(f"\\n[bold green]✅ Scraping completed![/bold green]")
+        console = self.console
+        if self.stop_reason is not None:
+            console.print(f"\n[yellow]⏹️  Stopped early: {self.stop_reason}[/yellow]")
+        console.print(f"\n[bold green]✅ Scraping completed![/bold green]")
+        summary = self.summary()
+        display_metrics(console, self.metrics)
         
-        successful = sum(1 for success in self.completed.values() if success)
-        failed = len(self.failed_urls)
+        if self.shard is None:
+            display_summary(console, summary)
+            return
         
-        # Summary table
-        table = Table(title="Scraping Summary")
-        table.add_column("Metric", style="cyan")
-        table.add_column("Count", style="green")
-        
-        table.add_row("Total URLs processed", str(len(self.completed)))
-        table.add_row("Successful", str(successful))
-        table.add_row("Failed", str(failed))
-        
-        console.print(table)
-        
-        # Show failed URLs if any
-        if self.failed_urls:
-            console.print(f"\\n[red]❌ Failed URLs ({len(self.failed_urls)}):[/red]")
-            for url in self.failed_urls[:10]:  # Show first 10
-                console.print(f"  • {url}")
-            if len(self.failed_urls) > 10:
-                console.print(f"  ... and {len(self.failed_urls) - 10} more")
+        self.shard.write_summary(summary)
+        display_summary(console, summary, title=f"Shard {self.shard.index} Summary")
+        if self.shard.index == 0:
+            merged = await self.shard.merged_summary()
+            if merged is None:
+                console.print("[yellow]⚠️  Not every shard reported a summary, skipping the merged one[/yellow]")
+            else:
+                display_summary(console, merged, title=f"Merged Summary ({self.shard.shards} shards)")
+
+
+# Summary keys and their labels, in display order
+SUMMARY_ROWS = (
+    ("processed", "Total URLs processed"),
+    ("successful", "Successful"),
+    ("failed", "Failed"),
+    ("checked", "Checked without download"),
+    ("seeded", "Seeded from sitemaps"),
+    ("disallowed", "Disallowed by robots.txt"),
+    ("filtered", "Links skipped by --include/--exclude"),
+    ("not_modified", "Not modified (cached)"),
+    ("retries", "Retries"),
+    ("fast_failed", "Failed fast (circuit open)"),
+    ("exact_duplicates", "Exact duplicates (links reused)"),
+    ("near_duplicates", "Near duplicates (links reused)"),
+    ("records", "Records written"),
+    ("archived", "Pages archived to WARC"),
+    ("dns_lookups", "DNS lookups"),
+    ("dns_cache_hits", "DNS cache hits"),
+    ("unfetched", "Left in frontier (budget reached)"),
+    ("spilled", "Frontier entries spilled to disk"),
+)
+
+
+def display_summary(console, summary: dict, title: str = "Scraping Summary"):
+    """Render a crawl summary table and the first failed URLs."""
+    _, _, Table = _get_rich_components()
+    
+    # Summary table
+    table = Table(title=title)
+    table.add_column("Metric", style="cyan")
+    table.add_column("Count", style="green")
+    
+    for key, label in SUMMARY_ROWS:
+        if key in summary:
+            table.add_row(label, str(summary[key]))
+    
+    console.print(table)
+    
+    # Show failed URLs if any
+    failed_urls = summary.get("failed_urls", [])
+    if failed_urls:
+        # Only the first failures are kept, so the count comes from the summary
+        failed = max(summary.get("failed", 0), len(failed_urls))
+        console.print(f"\n[red]❌ Failed URLs ({failed}):[/red]")
+        for url in failed_urls[:10]:  # Show first 10
+            console.print(f"  • {url}")
+        if failed > 10:
+            console.print(f"  ... and {failed - 10} more")
+
+
+# Latency histograms and their labels, in display order
+METRICS_ROWS = (
+    ("wait", "Politeness wait"),
+    ("dns", "DNS"),
+    ("connect", "Connect"),
+    ("tls", "TLS"),
+    ("ttfb", "Time to first byte"),
+    ("request", "Request total"),
+    ("parse", "Parse"),
+)
+
+
+def display_metrics(console, metrics: CrawlMetrics):
+    """Render latency percentiles and the hosts with the most errors."""
+    _, _, Table = _get_rich_components()
+    
+    table = Table(title="Latency")
+    table.add_column("Phase", style="cyan")
+    table.add_column("Count", style="green")
+    for column in ("p50", "p90", "p99"):
+        table.add_column(column, style="green")
+    
+    for name, label in METRICS_ROWS:
+        histogram = metrics.histograms[name]
+        if histogram.count:
+            quantiles = (histogram.quantile(q) * 1000 for q in (0.5, 0.9, 0.99))
+            table.add_row(label, str(histogram.count), *(f"{value:.1f}ms" for value in quantiles))
+    
+    console.print(table)
+    console.print(f"Downloaded {metrics.bytes / 1_048_576:.2f} MiB in {metrics.requests} requests")
+    
+    erroring = sorted(
+        ((errors / requests, host, errors, requests) for host, (requests, errors) in metrics.hosts.items() if errors),
+        reverse=True,
+    )
+    for rate, host, errors, requests in erroring[:5]:
+        console.print(f"  [red]{host}[/red]: {errors}/{requests} errors ({rate:.0%})")
+
+
+def _get_scrape_config(ctx) -> dict:
+    """Return the [SCRAPE] section of the loaded config, or an empty dict."""
+    config = getattr(ctx.obj, "config", None) or {}
+    return config.get("SCRAPE", {})
+
+
+class LazyScrapeGroup(click.Group):
+    """A group that lazy-loads the scrape subcommands to improve startup time."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._command_modules = {
+            'bench': 'commands.scrape_bench',
+            'report': 'commands.scrape_report',
+            'extract': 'commands.scrape_extract',
+            'diff': 'commands.scrape_diff',
+        }
+    
+    def get_command(self, ctx, cmd_name):
+        """Lazy load subcommand when first accessed."""
+        if cmd_name in self._command_modules:
+            module = __import__(self._command_modules[cmd_name], fromlist=[cmd_name])
+            return getattr(module, cmd_name)
+        return super().get_command(ctx, cmd_name)
+    
+    def list_commands(self, ctx):
+        """List all available subcommands."""
+        return list(self._command_modules.keys())
 
 
-@click.command()
-@click.option("-u", "--url", required=True, help="Starting URL to scrape")
+@click.group(cls=LazyScrapeGroup, invoke_without_command=True)
+@click.option("-u", "--url", help="Starting URL to scrape")
 @click.option(
     "-d", "--depth", 
     default=1, 
@@ -223,9 +1044,264 @@ class AsyncScraper:
     show_default=True,
     help="Maximum concurrent requests"
 )
+@click.option(
+    "--query-policy",
+    type=click.Choice(QUERY_POLICIES),
+    default="keep",
+    show_default=True,
+    help="How query strings are treated when deduplicating URLs"
+)
+@click.option(
+    "--per-host-concurrency",
+    type=int,
+    help="Maximum concurrent requests to a single host (or set SCRAPE:per_host_concurrency)"
+)
+@click.option(
+    "--per-host-rps",
+    type=float,
+    help="Maximum requests per second to a single host (or set SCRAPE:per_host_rps)"
+)
+@click.option(
+    "--http2/--no-http2",
+    default=None,
+    help="Negotiate HTTP/2 where supported (or set SCRAPE:http2, needs the h2 package)"
+)
+@click.option(
+    "--max-body-bytes",
+    type=int,
+    help=f"Stop reading a page after this many bytes, 0 for no limit "
+         f"(or set SCRAPE:max_body_bytes, default {DEFAULT_MAX_BODY_BYTES})"
+)
+@click.option(
+    "--parse-workers",
+    default=0,
+    show_default=True,
+    help="Parse pages in this many worker processes (0 parses on the event loop)"
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help="Revalidate pages against the on-disk ETag / Last-Modified cache "
+         "(SCRAPE:cache_path, SCRAPE:cache_max_bytes; each shard gets its own file)"
+)
+@click.option(
+    "--checkpoint/--no-checkpoint",
+    default=True,
+    help="Periodically checkpoint the crawl so it can be resumed"
+)
+@click.option("--resume", "resume_id", help="Resume the crawl with this id from its last checkpoint")
+@click.option(
+    "--keep-crawls",
+    type=click.IntRange(min=0),
+    help=f"Keep the checkpoints and link graphs of only this many recent crawls, deleting older ones; "
+         f"0 keeps all (or set SCRAPE:keep_crawls, default {DEFAULT_KEEP_CRAWLS})"
+)
+@click.option(
+    "--check-only",
+    is_flag=True,
+    help="Verify leaf, external and img/script/link asset URLs with HEAD instead of downloading them"
+)
+@click.option(
+    "--output",
+    type=click.Choice(OUTPUT_FORMATS),
+    help="Stream a record per URL in this format while crawling"
+)
+@click.option(
+    "--output-file",
+    default="-",
+    show_default=True,
+    help="Where --output records go ('-' for stdout, progress then goes to stderr)"
+)
+@click.option(
+    "--shards",
+    default=1,
+    show_default=True,
+    help="Split the crawl by host into this many shards (spawned locally unless --shard-index is given)"
+)
+@click.option("--shard-index", type=int, help="Run only this shard (0-based), e.g. one per machine")
+@click.option(
+    "--shard-dir",
+    type=click.Path(file_okay=False),
+    help="Fresh directory shared by all shards for exchanging URLs and summaries"
+)
+@click.option(
+    "--robots/--no-robots",
+    default=True,
+    help="Skip pages disallowed by robots.txt (cached for SCRAPE:robots_ttl seconds)"
+)
+@click.option(
+    "--sitemaps",
+    is_flag=True,
+    help="Seed the frontier from the sitemaps listed in robots.txt (up to SCRAPE:sitemap_max_urls)"
+)
+@click.option(
+    "--priority",
+    type=click.Choice(PRIORITIES),
+    help="Frontier order: fifo (breadth-first as discovered), depth (shallowest first) or same-domain "
+         "(shallowest first, other hosts last) (or set SCRAPE:priority, default fifo)"
+)
+@click.option(
+    "--boost",
+    "boost_values",
+    multiple=True,
+    metavar="REGEX=WEIGHT",
+    help="Fetch URLs matching REGEX earlier, as if WEIGHT levels shallower (repeatable, implies --priority depth)"
+)
+@click.option(
+    "--include",
+    multiple=True,
+    metavar="PATTERN",
+    help=f"Only crawl URLs whose path and query, as found on the page, match this glob "
+         f"(* matches anything) or {REGEX_PREFIX}<regex> (repeatable)"
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    metavar="PATTERN",
+    help=f"Never crawl or check URLs whose path and query, as found on the page, match this glob "
+         f"or {REGEX_PREFIX}<regex> (repeatable), e.g. '/calendar/*' or '{REGEX_PREFIX}[?&]page=\\d{{3,}}'"
+)
+@click.option("--max-pages", type=click.IntRange(min=1), help="Stop after fetching this many pages")
+@click.option("--time-budget", type=click.FloatRange(min=0, min_open=True), help="Stop after this many seconds")
+@click.option(
+    "--warc",
+    type=click.Path(dir_okay=False),
+    help="Archive fetched pages to rotating WARC files named after this path, e.g. crawl.warc.gz "
+         "(SCRAPE:warc_max_bytes sets the rotation size)"
+)
+@click.option(
+    "--link-graph/--no-link-graph",
+    default=None,
+    help="Keep the crawl's link graph for `util scrape report`; saved next to the checkpoint or to --graph-file. "
+         "On by default, except with --visited-fpr since the graph holds every URL in memory"
+)
+@click.option("--graph-file", type=click.Path(dir_okay=False), help="Save the link graph to this file")
+@click.option(
+    "--frontier-memory",
+    type=int,
+    help=f"Frontier entries kept in memory before spilling to disk "
+         f"(or set SCRAPE:frontier_memory, default {DEFAULT_FRONTIER_MEMORY})"
+)
+@click.option(
+    "--visited-fpr",
+    type=float,
+    help="Track visited URLs in a Bloom filter with this false-positive rate instead of an exact set "
+         "(or set SCRAPE:visited_fpr)"
+)
+@click.option(
+    "--visited-capacity",
+    type=int,
+    help=f"URLs the --visited-fpr filter is sized for "
+         f"(or set SCRAPE:visited_capacity, default {DEFAULT_VISITED_CAPACITY})"
+)
+@click.option(
+    "--retries",
+    type=int,
+    help=f"Retry transient errors, 408/425/429 and 5xx this many times with jittered exponential backoff, "
+         f"honoring Retry-After (or set SCRAPE:retries, SCRAPE:retry_backoff, SCRAPE:retry_max_delay; "
+         f"default {DEFAULT_RETRIES})"
+)
+@click.option(
+    "--circuit-breaker/--no-circuit-breaker",
+    default=True,
+    help="Fail a host's URLs fast after repeated failures and probe it again later "
+         "(SCRAPE:breaker_threshold, SCRAPE:breaker_reset)"
+)
+@click.option(
+    "--dedup/--no-dedup",
+    default=None,
+    help="Fingerprint page bodies and reuse the links of exact or near-duplicate pages instead of parsing them "
+         "(or set SCRAPE:dedup, SCRAPE:dedup_distance, SCRAPE:dedup_entries)"
+)
+@click.option(
+    "--dns-cache/--no-dns-cache",
+    default=True,
+    help=f"Resolve hosts through a shared async cache, prefetching them as URLs are queued "
+         f"(SCRAPE:dns_ttl, SCRAPE:dns_negative_ttl; defaults {DEFAULT_DNS_TTL:g}s and {DEFAULT_NEGATIVE_TTL:g}s)"
+)
+@click.option(
+    "--adaptive/--no-adaptive",
+    default=None,
+    help="Adapt concurrency (AIMD) overall and per host up to --max-concurrent, "
+         "backing off on timeouts, 429 and 503 (or set SCRAPE:adaptive)"
+)
+@click.option("--metrics-file", type=click.Path(dir_okay=False), help="Periodically export crawl metrics to this file")
+@click.option(
+    "--metrics-format",
+    type=click.Choice(METRICS_FORMATS),
+    default="json",
+    show_default=True,
+    help="Format of the --metrics-file snapshots"
+)
+@click.option(
+    "--metrics-interval",
+    default=DEFAULT_METRICS_INTERVAL,
+    show_default=True,
+    help="Seconds between --metrics-file snapshots"
+)
 @click.pass_context
-async def scrape(ctx, url, depth, stay_in_domain, max_concurrent):
+async def scrape(ctx, url, depth, stay_in_domain, max_concurrent, query_policy,
+                 per_host_concurrency, per_host_rps, http2, max_body_bytes, parse_workers, cache,
+                 checkpoint, resume_id, keep_crawls, check_only, output, output_file, shards, shard_index, shard_dir,
+                 robots, sitemaps, include, exclude, priority, boost_values, max_pages, time_budget, warc,
+                 link_graph, graph_file, frontier_memory, visited_fpr, visited_capacity, retries, circuit_breaker,
+                 dedup, dns_cache, adaptive, metrics_file, metrics_format, metrics_interval):
     """Scrape a website asynchronously for links and check for dead links."""
+    if ctx.invoked_subcommand is not None:
+        return
+    
+    console = _get_console(stderr=output is not None and output_file == "-")
+    
+    if shards > 1:
+        if resume_id:
+            console.print("[red]❌ --resume is not supported for sharded crawls[/red]")
+            return
+        if max_pages or time_budget:
+            console.print("[red]❌ --max-pages and --time-budget are not supported for sharded crawls[/red]")
+            return
+        if output and output_file == "-":
+            console.print("[red]❌ Sharded crawls need --output-file; each shard writes <file>.<index>[/red]")
+            return
+        if not url:
+            console.print("[red]❌ --url is required[/red]")
+            return
+        if shard_index is None:
+            await spawn_shards(console, url, shards, shard_dir)
+            return
+        if not shard_dir:
+            console.print("[red]❌ --shard-dir is required with --shard-index[/red]")
+            return
+        # Shards are coordinated through the shard directory rather than a checkpoint
+        checkpoint = False
+        if output:
+            output_file = f"{output_file}.{shard_index}"
+        if metrics_file:
+            metrics_file = f"{metrics_file}.{shard_index}"
+        if graph_file:
+            graph_file = f"{graph_file}.{shard_index}"
+        if warc:
+            base, suffix = _get_warc().split_warc_path(warc)
+            warc = f"{base}-shard{shard_index}{suffix}"
+    
+    writer = ResultWriter(output_file, output, append=bool(resume_id)) if output else None
+    
+    crawl_checkpoint = None
+    if resume_id:
+        try:
+            crawl_checkpoint = CrawlCheckpoint(resume_id, resume=True)
+        except FileNotFoundError as e:
+            console.print(f"[red]❌ {e}[/red]")
+            return
+        # The crawl's own options win over the command line when resuming
+        meta = crawl_checkpoint.load_meta()
+        url = meta["start_url"]
+        depth = meta["max_depth"]
+        stay_in_domain = meta["stay_in_domain"]
+        query_policy = meta["query_policy"]
+        check_only = meta.get("check_only", False)
+    elif not url:
+        console.print("[red]❌ Either --url or --resume is required[/red]")
+        return
     
     # Validate URL
     try:
@@ -239,17 +1315,205 @@ async def scrape(ctx, url, depth, stay_in_domain, max_concurrent):
     
     logger.debug(f"Starting scrape with options: url={url}, depth={depth}, stay_in_domain={stay_in_domain}")
     
+    # Politeness and connection pool settings fall back to the [SCRAPE] config section
+    scrape_config = _get_scrape_config(ctx)
+    politeness = PolitenessScheduler.from_config(
+        scrape_config, concurrency=per_host_concurrency, rps=per_host_rps
+    )
+    if http2 is None:
+        http2 = bool(scrape_config.get("http2", False))
+    if max_body_bytes is None:
+        max_body_bytes = int(scrape_config.get("max_body_bytes", DEFAULT_MAX_BODY_BYTES))
+    if frontier_memory is None:
+        frontier_memory = int(scrape_config.get("frontier_memory", DEFAULT_FRONTIER_MEMORY))
+    if visited_fpr is None and "visited_fpr" in scrape_config:
+        visited_fpr = float(scrape_config["visited_fpr"])
+    if priority is None:
+        priority = scrape_config.get("priority", "fifo")
+        if priority not in PRIORITIES:
+            console.print(f"[red]❌ SCRAPE:priority must be one of {', '.join(PRIORITIES)}, got {priority}[/red]")
+            return
+    try:
+        boosts = parse_boosts(boost_values)
+        url_filter = UrlFilter(include, exclude)
+    except ValueError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        return
+    if visited_capacity is None:
+        visited_capacity = int(scrape_config.get("visited_capacity", DEFAULT_VISITED_CAPACITY))
+    transport_errors = (_get_httpx().TransportError,)
+    if retries is None:
+        retries = int(scrape_config.get("retries", DEFAULT_RETRIES))
+    retry_policy = None
+    if retries > 0:
+        retry_policy = RetryPolicy(
+            retries,
+            backoff=float(scrape_config.get("retry_backoff", DEFAULT_BACKOFF)),
+            max_delay=float(scrape_config.get("retry_max_delay", DEFAULT_MAX_DELAY)),
+            transport_errors=transport_errors,
+        )
+    breaker = None
+    if circuit_breaker:
+        breaker = CircuitBreaker(
+            int(scrape_config.get("breaker_threshold", DEFAULT_FAILURE_THRESHOLD)),
+            float(scrape_config.get("breaker_reset", DEFAULT_RESET_TIMEOUT)),
+            transport_errors=transport_errors,
+        )
+    if dedup is None:
+        dedup = bool(scrape_config.get("dedup", False))
+    content_index = None
+    if dedup:
+        content_index = ContentIndex(
+            int(scrape_config.get("dedup_entries", DEFAULT_DEDUP_ENTRIES)),
+            int(scrape_config.get("dedup_distance", DEFAULT_DEDUP_DISTANCE)),
+        )
+    resolver = None
+    if dns_cache:
+        resolver = CachingResolver(
+            ttl=float(scrape_config.get("dns_ttl", DEFAULT_DNS_TTL)),
+            negative_ttl=float(scrape_config.get("dns_negative_ttl", DEFAULT_NEGATIVE_TTL)),
+        )
+    if adaptive is None:
+        adaptive = bool(scrape_config.get("adaptive", False))
+    adaptive_limits = None
+    if adaptive:
+        adaptive_limits = AdaptiveConcurrency(
+            max_concurrent,
+            per_host_maximum=politeness.default.concurrency,
+            congestion_errors=(_get_httpx().TimeoutException,),
+        )
+    
+    validator_cache = None
+    if cache:
+        cache_path = Path(scrape_config.get("cache_path", DEFAULT_CACHE_FILE))
+        if shard_index is not None:
+            # Local shards would otherwise contend for one SQLite write lock. Hosts always
+            # hash to the same shard, so each shard's cache still covers its own pages
+            cache_path = cache_path.with_name(f"{cache_path.stem}.shard{shard_index}{cache_path.suffix}")
+        validator_cache = ValidatorCache(
+            cache_path,
+            int(scrape_config.get("cache_max_bytes", DEFAULT_CACHE_MAX_BYTES)),
+        )
+    
+    robots_cache = None
+    if robots or sitemaps:
+        robots_support = _get_robots()
+        robots_cache = robots_support.RobotsCache(
+            ttl=float(scrape_config.get("robots_ttl", robots_support.DEFAULT_ROBOTS_TTL)),
+            max_sitemap_urls=int(scrape_config.get("sitemap_max_urls", robots_support.DEFAULT_SITEMAP_MAX_URLS)),
+        )
+    
+    if crawl_checkpoint is None and checkpoint:
+        crawl_checkpoint = CrawlCheckpoint(new_crawl_id(url))
+        crawl_checkpoint.save_meta(
+            start_url=url, max_depth=depth, stay_in_domain=stay_in_domain, query_policy=query_policy,
+            check_only=check_only,
+        )
+        if keep_crawls is None:
+            keep_crawls = int(scrape_config.get("keep_crawls", DEFAULT_KEEP_CRAWLS))
+        pruned = prune_crawls(keep_crawls, current=crawl_checkpoint.crawl_id)
+        if pruned:
+            logger.debug(f"Deleted {pruned} old crawls, keeping the last {keep_crawls}")
+    
+    graph = None
+    if link_graph is None:
+        link_graph = graph_file is not None or not visited_fpr
+        if not link_graph:
+            console.print("[yellow]⚠️  Not keeping the link graph with --visited-fpr, "
+                          "pass --link-graph to keep it anyway[/yellow]")
+    if link_graph:
+        if graph_file is None and crawl_checkpoint is not None:
+            graph_file = crawl_checkpoint.path.with_suffix(GRAPH_SUFFIX)
+        if graph_file is None:
+            logger.debug("No checkpoint or --graph-file to save the link graph to, not keeping it")
+        elif resume_id and Path(graph_file).exists():
+            graph = LinkGraph.load(graph_file)
+        else:
+            graph = LinkGraph()
+    
+    warc_writer = None
+    if warc:
+        warc_support = _get_warc()
+        warc_writer = warc_support.WarcWriter(
+            warc, int(scrape_config.get("warc_max_bytes", warc_support.DEFAULT_WARC_MAX_BYTES))
+        )
+    
     try:
         scraper = AsyncScraper(
             start_url=url,
             max_depth=depth,
             stay_in_domain=stay_in_domain,
-            max_concurrent=max_concurrent
+            max_concurrent=max_concurrent,
+            query_policy=query_policy,
+            politeness=politeness,
+            http2=http2,
+            max_keepalive=scrape_config.get("max_keepalive"),
+            max_body_bytes=max_body_bytes,
+            parse_workers=parse_workers,
+            cache=validator_cache,
+            checkpoint=crawl_checkpoint,
+            check_only=check_only,
+            writer=writer,
+            shard=_get_sharding().ShardRouter(shard_dir, shards, shard_index) if shards > 1 else None,
+            robots=robots_cache,
+            obey_robots=robots,
+            sitemaps=sitemaps,
+            metrics_file=metrics_file,
+            metrics_format=metrics_format,
+            metrics_interval=metrics_interval,
+            adaptive=adaptive_limits,
+            frontier_memory=frontier_memory,
+            visited_fpr=visited_fpr,
+            visited_capacity=visited_capacity,
+            dedup=content_index,
+            retry=retry_policy,
+            breaker=breaker,
+            resolver=resolver,
+            graph=graph,
+            graph_file=graph_file,
+            priority=priority,
+            boosts=boosts,
+            max_pages=max_pages,
+            time_budget=time_budget,
+            url_filter=url_filter if url_filter else None,
+            warc=warc_writer,
         )
         await scraper.run()
     except KeyboardInterrupt:
-        console.print("\\n[yellow]⚠️  Scraping interrupted by user[/yellow]")
+        console.print("\n[yellow]⚠️  Scraping interrupted by user[/yellow]")
     except Exception as e:
         console.print(f"[red]❌ Scraping failed: {e}[/red]")
         logger.error(f"Scrape command error: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+async def spawn_shards(console, url: str, shards: int, shard_dir: str | None):
+    """Run every shard as a local subprocess of this command and print the merged summary."""
+    shard_dir = shard_dir or str(CACHE_DIR / "shards" / new_crawl_id(url))
+    console.print(f"[bold green]🕷️  Starting {shards} crawl shards for {url}[/bold green]")
+    console.print(f"Shard directory: {shard_dir}")
+    
+    # Re-run this exact command line once per shard; later options override earlier ones
+    base_args = [sys.executable, sys.argv[0], *sys.argv[1:], "--shard-dir", shard_dir]
+    processes = [
+        await asyncio.create_subprocess_exec(
+            *base_args, "--shard-index", str(index), stdout=subprocess.DEVNULL
+        )
+        for index in range(shards)
+    ]
+    try:
+        codes = await asyncio.gather(*(process.wait() for process in processes))
+    finally:
+        for process in processes:
+            if process.returncode is None:
+                process.terminate()
+    
+    for index, code in enumerate(codes):
+        if code != 0:
+            console.print(f"[red]❌ Shard {index} exited with status {code}[/red]")
+    
+    sharding = _get_sharding()
+    summaries = sharding.read_summaries(shard_dir, shards)
+    console.print(f"\n[bold green]✅ Scraping completed![/bold green]")
+    display_summary(console, sharding.merge_summaries([summary for summary in summaries if summary]),
+                    title=f"Merged Summary ({shards} shards)")
@@ -0,0 +1,187 @@
+"""Scraper benchmark against synthetic sites."""
+import asyncio
+import json
+import logging
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+import asyncclick as click
+from commands.scrape import AsyncScraper
+from util.bench import DEFAULT_TOLERANCE, SCENARIOS, SiteSpec, SyntheticSite, compare, environment, \
+    load_results, run_isolated, spec_dict
+from util.logging import init_logging
+
+def _get_console(stderr: bool = False, quiet: bool = False):
+    """Lazy import Console to improve startup time."""
+    from rich.console import Console
+    return Console(stderr=stderr, quiet=quiet)
+
+def _get_table():
+    """Lazy import Table to improve startup time."""
+    from rich.table import Table
+    return Table
+
+
+def bench_scenario(spec: dict, max_concurrent: int, parse_workers: int, log_level: str = "ERROR") -> dict:
+    """
+    Crawl a synthetic site once and measure the crawl.
+
+    Meant to run in a fresh process through `run_isolated`. CPU time covers the
+    scraper's thread and its parse workers, not the thread serving the site.
+    """
+    init_logging(log_level)
+    spec = SiteSpec(**spec)
+    with SyntheticSite(spec) as site:
+        scraper = AsyncScraper(site.url, max_depth=0, max_concurrent=max_concurrent,
+                               parse_workers=parse_workers, obey_robots=False)
+        scraper.console = _get_console(quiet=True)
+        cpu_started = time.thread_time()
+        started = time.perf_counter()
+        asyncio.run(scraper.run())
+        elapsed = time.perf_counter() - started
+        cpu_time = time.thread_time() - cpu_started
+    
+    # Parse workers are only counted in RUSAGE_CHILDREN once they have been reaped
+    for child in multiprocessing.active_children():
+        child.join()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    request = scraper.metrics.histograms["request"]
+    # No quantiles when no request completed, e.g. every fetch failed
+    p50, p99 = request.quantile(0.5), request.quantile(0.99)
+    pages = scraper.processed
+    return {
+        "spec": spec_dict(spec),
+        "pages": pages,
+        "errors": scraper.failed,
+        "bytes": scraper.metrics.bytes,
+        "elapsed": round(elapsed, 4),
+        "pages_per_sec": round(pages / elapsed, 2),
+        "latency_p50": round(p50, 6) if p50 is not None else None,
+        "latency_p99": round(p99, 6) if p99 is not None else None,
+        "cpu_time": round(cpu_time + children.ru_utime + children.ru_stime, 4),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+@click.command()
+@click.option(
+    "-s", "--scenario", "scenario_names",
+    multiple=True,
+    type=click.Choice(list(SCENARIOS)),
+    help="Built-in scenario to run (repeatable, default all unless a custom site is given)"
+)
+@click.option("--pages", type=int, help="Run a custom site with this many pages")
+@click.option("--fanout", type=int, help="Links per page of the custom site")
+@click.option("--page-bytes", type=int, help="Size of each page of the custom site")
+@click.option("--latency-ms", type=float, help="Latency injected into every response of the custom site")
+@click.option("--error-rate", type=float, help="Fraction of custom site pages that return 500")
+@click.option("--seed", default=0, show_default=True, help="Seed for the custom site's random links and errors")
+@click.option("--repeat", default=1, show_default=True, help="Runs per scenario; the median by pages/sec is kept")
+@click.option("--max-concurrent", default=10, show_default=True, help="Maximum concurrent requests")
+@click.option("--parse-workers", default=0, show_default=True, help="Parse pages in this many worker processes")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Write the results JSON here instead of stdout")
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare against a results file saved with --output; exits 1 on regressions"
+)
+@click.option(
+    "--tolerance",
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction a metric may get worse than the baseline before it counts as a regression"
+)
+@click.pass_context
+async def bench(ctx, scenario_names, pages, fanout, page_bytes, latency_ms, error_rate, seed, repeat,
+                max_concurrent, parse_workers, output, baseline, tolerance):
+    """Benchmark the scraper against synthetic sites served from localhost."""
+    # Results go to stdout unless written to a file, so keep the console on stderr
+    console = _get_console(stderr=output is None)
+    
+    specs = [SCENARIOS[name] for name in scenario_names]
+    custom = {"pages": pages, "fanout": fanout, "page_bytes": page_bytes, "latency_ms": latency_ms,
+              "error_rate": error_rate}
+    if any(value is not None for value in custom.values()):
+        overrides = {key: value for key, value in custom.items() if value is not None}
+        specs.append(SiteSpec("custom", seed=seed, **overrides))
+    elif not specs:
+        specs = list(SCENARIOS.values())
+    
+    log_level = logging.getLevelName(logging.getLogger().getEffectiveLevel())
+    results = {"environment": environment(), "max_concurrent": max_concurrent, "parse_workers": parse_workers,
+               "scenarios": {}}
+    for spec in specs:
+        runs = []
+        for attempt in range(repeat):
+            console.print(f"[cyan]⏱️  {spec.name}[/cyan] run {attempt + 1}/{repeat}: "
+                          f"{spec.pages} pages, fan-out {spec.fanout}, {spec.page_bytes} bytes")
+            runs.append(await asyncio.to_thread(
+                run_isolated, bench_scenario, spec_dict(spec), max_concurrent, parse_workers, log_level
+            ))
+        runs.sort(key=lambda run: run["pages_per_sec"])
+        results["scenarios"][spec.name] = {**runs[len(runs) // 2], "runs": repeat}
+    
+    display_bench(console, results)
+    
+    text = json.dumps(results, indent=2)
+    if output is None:
+        click.echo(text)
+    else:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+        console.print(f"Results written to {output}")
+    
+    if baseline:
+        rows = compare(results, load_results(baseline), tolerance)
+        display_comparison(console, rows, baseline)
+        if any(row["regressed"] for row in rows):
+            ctx.exit(1)
+
+
+def display_bench(console, results: dict):
+    """Render benchmark results as a table."""
+    Table = _get_table()
+    
+    table = Table(title="Scrape Benchmark")
+    table.add_column("Scenario", style="cyan")
+    for column in ("Pages", "Errors", "Pages/s", "p50", "p99", "CPU", "RSS"):
+        table.add_column(column, style="green")
+    
+    for name, result in results["scenarios"].items():
+        table.add_row(
+            name,
+            str(result["pages"]),
+            str(result["errors"]),
+            f"{result['pages_per_sec']:.1f}",
+            *(f"{result[key] * 1000:.1f}ms" if result[key] is not None else "-"
+              for key in ("latency_p50", "latency_p99")),
+            f"{result['cpu_time']:.2f}s",
+            f"{result['peak_rss_mb']:.0f} MiB",
+        )
+    
+    console.print(table)
+
+
+def display_comparison(console, rows: list[dict], baseline: str):
+    """Render the changes against a baseline, highlighting regressions."""
+    Table = _get_table()
+    
+    table = Table(title=f"Compared with {baseline}")
+    table.add_column("Scenario", style="cyan")
+    table.add_column("Metric", style="cyan")
+    table.add_column("Baseline")
+    table.add_column("Current")
+    table.add_column("Change")
+    
+    for row in rows:
+        style = "red" if row["regressed"] else "green"
+        table.add_row(row["scenario"], row["metric"], f"{row['baseline']:g}", f"{row['current']:g}",
+                      f"[{style}]{row['change']:+.1%}[/{style}]")
+    
+    console.print(table)
+    regressions = sum(row["regressed"] for row in rows)
+    if regressions:
+        console.print(f"[red]❌ {regressions} metrics regressed beyond the tolerance[/red]")
+    else:
+        console.print("[green]✅ No regressions[/green]")
@@ -0,0 +1,103 @@
+"""Comparison of two checkpointed crawls."""
+import asyncio
+import sqlite3
+import time
+import asyncclick as click
+from util.crawldiff import CHANGES, checkpoint_path, diff_crawls
+from util.results import ResultWriter
+
+def _get_console(stderr: bool = False):
+    """Lazy import Console to improve startup time."""
+    from rich.console import Console
+    return Console(stderr=stderr)
+
+def _get_table():
+    """Lazy import Table to improve startup time."""
+    from rich.table import Table
+    return Table
+
+
+@click.command()
+@click.argument("before")
+@click.argument("after")
+@click.option("--top", default=20, show_default=True, help="URLs shown per kind of change")
+@click.option(
+    "--output-file",
+    help="Also write every difference as a JSON line to this file ('-' for stdout, tables then go to stderr)"
+)
+async def diff(before, after, top, output_file):
+    """
+    Show what changed between two crawls: new and vanished pages, newly broken links and changed pages.
+
+    BEFORE and AFTER are crawl ids (or checkpoint files); the crawls must have been run with checkpoints.
+    """
+    console = _get_console(stderr=output_file == "-")
+    paths = [checkpoint_path(crawl) for crawl in (before, after)]
+    for crawl, path in zip((before, after), paths):
+        if not path.exists():
+            console.print(f"[red]❌ No checkpoint for crawl {crawl} ({path})[/red]")
+            return
+    
+    writer = ResultWriter(output_file, "jsonl") if output_file else None
+    writer_task = asyncio.create_task(writer.run()) if writer is not None else None
+    counts = dict.fromkeys(CHANGES, 0)
+    examples = {change: [] for change in CHANGES}
+    started = time.perf_counter()
+    
+    def differences(batch_size: int = 10_000):
+        # Runs on a thread; hands differences back in batches
+        batch = []
+        for difference in diff_crawls(*paths):
+            batch.append(difference)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    try:
+        batches = differences()
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            for change, url, status_before, status_after in batch:
+                counts[change] += 1
+                if len(examples[change]) < top:
+                    examples[change].append((url, status_before, status_after))
+                if writer is not None:
+                    await writer.write({"change": change, "url": url, "before": status_before,
+                                        "after": status_after})
+    except (sqlite3.Error, ValueError) as e:
+        console.print(f"[red]❌ Cannot compare the crawls: {e}[/red]")
+        return
+    finally:
+        if writer is not None:
+            await writer.close()
+            await writer_task
+    elapsed = time.perf_counter() - started
+    
+    Table = _get_table()
+    labels = {
+        "added": "New pages",
+        "removed": "Vanished pages",
+        "broke": "Newly broken",
+        "fixed": "Fixed",
+        "status": "Status changed",
+        "links": "Links changed",
+    }
+    table = Table(title=f"Crawl Diff: {paths[0].stem} → {paths[1].stem}")
+    table.add_column("Change", style="cyan")
+    table.add_column("URLs", style="green")
+    for change in CHANGES:
+        table.add_row(labels[change], str(counts[change]))
+    console.print(table)
+    
+    for change in CHANGES:
+        if not examples[change]:
+            continue
+        console.print(f"\n[bold]{labels[change]}[/bold]")
+        for url, status_before, status_after in examples[change]:
+            statuses = f" ({status_before or '-'} → {status_after or '-'})" if change in ("broke", "fixed", "status") \
+                else ""
+            console.print(f"  • {url}{statuses}")
+        if counts[change] > top:
+            console.print(f"  ... and {counts[change] - top} more")
+    console.print(f"\nCompared in {elapsed:.1f}s")
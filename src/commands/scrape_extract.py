@@ -0,0 +1,86 @@
+"""Offline link extraction from WARC archives."""
+import asyncio
+import os
+import time
+import asyncclick as click
+from util.linkparse import ParsePool, is_html, parse_content_type
+from util.logging import logger
+from util.results import ResultWriter
+from util.warc import iter_responses
+
+def _get_console(stderr: bool = False):
+    """Lazy import Console to improve startup time."""
+    from rich.console import Console
+    return Console(stderr=stderr)
+
+
+@click.command()
+@click.argument("archives", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", default=os.cpu_count() or 1, show_default=True, help="Parse in this many worker processes")
+@click.option("--assets", is_flag=True, help="Collect img, script and link asset URLs as well")
+@click.option(
+    "--output-file",
+    default="-",
+    show_default=True,
+    help="Where the JSON-lines records go ('-' for stdout, progress then goes to stderr)"
+)
+@click.option("--max-pending", default=1000, show_default=True, help="Pages read ahead of the parse workers")
+async def extract(archives, workers, assets, output_file, max_pending):
+    """
+    Re-run link extraction over WARC archives written with --warc, without touching the network.
+
+    Writes one JSON line per HTML page with its url, status, links (and assets).
+    """
+    console = _get_console(stderr=output_file == "-")
+    writer = ResultWriter(output_file, "jsonl")
+    writer_task = asyncio.create_task(writer.run())
+    parse_pool = ParsePool(workers)
+    # Bounds the bodies held in memory while they wait for a worker
+    slots = asyncio.Semaphore(max_pending)
+    pages = 0
+    links = 0
+    failed = 0
+    
+    async def parse(url: str, status: int | None, charset: str | None, body: bytes):
+        nonlocal links, failed
+        try:
+            page_links, page_assets = await parse_pool.extract(body, url, charset, assets)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed to extract links from {url}: {e}")
+            return
+        finally:
+            slots.release()
+        links += len(page_links)
+        record = {"url": url, "status": status, "links": page_links}
+        if assets:
+            record["assets"] = page_assets
+        await writer.write(record)
+    
+    started = time.perf_counter()
+    tasks = set()
+    try:
+        for archive in archives:
+            console.print(f"[cyan]📦 {archive}[/cyan]")
+            records = iter_responses(archive)
+            # Reading and gunzipping happens on a thread, a record at a time
+            while (record := await asyncio.to_thread(next, records, None)) is not None:
+                url, status, content_type, body = record
+                if url is None or not is_html(content_type):
+                    continue
+                await slots.acquire()
+                pages += 1
+                task = asyncio.create_task(parse(url, status, parse_content_type(content_type)[1], body))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        parse_pool.shutdown()
+        await writer.close()
+        await writer_task
+    
+    elapsed = time.perf_counter() - started
+    console.print(f"[bold green]✅ Extracted {links} links from {pages} pages in {elapsed:.1f}s "
+                  f"({pages / elapsed if elapsed else 0:.0f} pages/s, {workers} workers)[/bold green]")
+    if failed:
+        console.print(f"[yellow]⚠️  {failed} pages could not be parsed[/yellow]")
@@ -0,0 +1,81 @@
+"""Link graph report for finished crawls."""
+import asyncio
+import json
+import asyncclick as click
+from util.linkgraph import LinkGraph, graph_path
+
+def _get_console(stderr: bool = False):
+    """Lazy import Console to improve startup time."""
+    from rich.console import Console
+    return Console(stderr=stderr)
+
+def _get_table():
+    """Lazy import Table to improve startup time."""
+    from rich.table import Table
+    return Table
+
+
+@click.command()
+@click.argument("crawls", nargs=-1, required=True)
+@click.option("--top", default=20, show_default=True, help="Rows shown per section")
+@click.option("--referrers", default=5, show_default=True, help="Referring pages listed per broken link")
+@click.option("--json", "as_json", is_flag=True, help="Print the full report as JSON instead of tables")
+async def report(crawls, top, referrers, as_json):
+    """
+    Report broken links with the pages that link to them, the most linked pages and orphan pages.
+
+    CRAWLS are crawl ids or link graph files; the graphs of a sharded crawl are merged.
+    """
+    console = _get_console(stderr=as_json)
+    graph = None
+    for crawl in crawls:
+        path = graph_path(crawl)
+        if not path.exists():
+            console.print(f"[red]❌ No link graph for {crawl} ({path})[/red]")
+            return
+        loaded = await asyncio.to_thread(LinkGraph.load, path)
+        if graph is None:
+            graph = loaded
+        else:
+            graph.merge(loaded)
+    
+    broken = graph.broken()
+    most_linked = graph.most_linked(top)
+    orphans = graph.orphans()
+    if as_json:
+        click.echo(json.dumps({
+            "urls": len(graph),
+            "edges": graph.edges,
+            "broken": [{"url": url, "status": status or None, "referrers": sources}
+                       for url, status, sources in broken],
+            "most_linked": [{"url": url, "in_degree": count} for url, count in most_linked],
+            "orphans": orphans,
+        }, indent=2))
+        return
+    
+    Table = _get_table()
+    console.print(f"[bold]🔗 {len(graph)} URLs, {graph.edges} links[/bold]")
+    
+    table = Table(title=f"Broken Links ({len(broken)})")
+    table.add_column("URL", style="red", overflow="fold")
+    table.add_column("Status")
+    table.add_column("Linked from", style="cyan")
+    for url, status, sources in broken[:top]:
+        shown = "\n".join(sources[:referrers])
+        if len(sources) > referrers:
+            shown += f"\n... and {len(sources) - referrers} more"
+        table.add_row(url, str(status or "error"), shown or "[dim](start URL or sitemap)[/dim]")
+    console.print(table)
+    
+    table = Table(title="Most Linked Pages")
+    table.add_column("URL", style="cyan")
+    table.add_column("Linked from", style="green")
+    for url, count in most_linked:
+        table.add_row(url, str(count))
+    console.print(table)
+    
+    console.print(f"\n[bold]Orphan pages ({len(orphans)})[/bold] fetched but not linked from any crawled page:")
+    for url in orphans[:top]:
+        console.print(f"  • {url}")
+    if len(orphans) > top:
+        console.print(f"  ... and {len(orphans) - top} more")
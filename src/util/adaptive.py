@@ -0,0 +1,163 @@
+"""Adaptive (AIMD) concurrency limits for crawlers."""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from util.logging import logger
+
+# Responses that mean the server wants us to back off
+CONGESTION_STATUSES = {429, 503}
+
+DEFAULT_INITIAL_LIMIT = 2
+DEFAULT_BACKOFF = 0.5
+# Stop growing once smoothed latency exceeds this multiple of the best seen
+DEFAULT_LATENCY_FACTOR = 3.0
+# Stop growing once the smoothed error rate exceeds this
+DEFAULT_MAX_ERROR_RATE = 0.1
+# Weight of the newest sample in the smoothed latency and error rate
+EWMA_WEIGHT = 0.1
+
+
+class AIMDLimit:
+    """
+    A concurrency limit that grows additively and shrinks multiplicatively.
+
+    Each healthy response raises the limit by 1/limit, so it grows by about one
+    per round of requests; a congestion signal multiplies it by `backoff`.
+    Growth pauses while smoothed latency or error rate look unhealthy, and only
+    one decrease happens per round trip so a burst of concurrent failures counts
+    as a single congestion event.
+    """
+
+    def __init__(self, maximum: int, initial: int = DEFAULT_INITIAL_LIMIT, minimum: int = 1,
+                 backoff: float = DEFAULT_BACKOFF, latency_factor: float = DEFAULT_LATENCY_FACTOR,
+                 max_error_rate: float = DEFAULT_MAX_ERROR_RATE):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.limit = float(max(self.minimum, min(initial, maximum)))
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.max_error_rate = max_error_rate
+        self.in_use = 0
+        self.latency = None  # smoothed latency
+        self.best_latency = None
+        self.error_rate = 0.0
+        self._last_decrease = 0.0
+        self._changed = asyncio.Condition()
+
+    @property
+    def current(self) -> int:
+        """The number of concurrent requests currently allowed."""
+        return int(self.limit)
+
+    async def acquire(self):
+        """Wait until a request may start under the current limit."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_use < self.current)
+            self.in_use += 1
+
+    async def release(self):
+        """Finish a request started with `acquire`."""
+        async with self._changed:
+            self.in_use -= 1
+            self._changed.notify()
+
+    async def _grown(self, before: int):
+        if self.current > before:
+            async with self._changed:
+                self._changed.notify(self.current - before)
+
+    def _healthy(self) -> bool:
+        if self.error_rate > self.max_error_rate:
+            return False
+        return self.latency is None or self.latency <= self.latency_factor * self.best_latency
+
+    async def on_success(self, latency: float):
+        """Record a healthy response and grow the limit if things look good."""
+        self.latency = latency if self.latency is None else (1 - EWMA_WEIGHT) * self.latency + EWMA_WEIGHT * latency
+        self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+        self.error_rate *= 1 - EWMA_WEIGHT
+        before = self.current
+        # Only grow while the limit is actually being used, otherwise it inflates unchecked
+        if self._healthy() and self.in_use >= before:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            await self._grown(before)
+
+    def on_error(self):
+        """Record a failure that isn't a congestion signal."""
+        self.error_rate = (1 - EWMA_WEIGHT) * self.error_rate + EWMA_WEIGHT
+
+    def on_congestion(self):
+        """Record a timeout or back-off response and cut the limit."""
+        self.on_error()
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limits applied to the whole crawl and to each host.
+
+    `congestion_errors` are the exception types (e.g. timeouts) that count as
+    congestion alongside 429 and 503 responses.
+    """
+
+    def __init__(self, maximum: int, per_host_maximum: int | None = None,
+                 initial: int = DEFAULT_INITIAL_LIMIT, congestion_errors: tuple[type, ...] = ()):
+        self.maximum = maximum
+        self.per_host_maximum = per_host_maximum or maximum
+        self.initial = initial
+        self.congestion_errors = congestion_errors
+        self.overall = AIMDLimit(maximum, initial=initial * 2)
+        self.hosts = {}
+
+    def host_limit(self, host: str) -> AIMDLimit:
+        """Return the limit for a host, creating it on first use."""
+        limit = self.hosts.get(host)
+        if limit is None:
+            limit = self.hosts[host] = AIMDLimit(self.per_host_maximum, initial=self.initial)
+        return limit
+
+    def is_congestion(self, error: BaseException) -> bool:
+        """Whether an exception means the server is overloaded or rate limiting us."""
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        return status in CONGESTION_STATUSES or isinstance(error, self.congestion_errors)
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold a request slot under the overall and per-host limits, adapting both to the outcome."""
+        host = self.host_limit(urlsplit(url).netloc.lower())
+        await self.overall.acquire()
+        try:
+            await host.acquire()
+            try:
+                started = time.monotonic()
+                try:
+                    yield
+                except Exception as e:
+                    if self.is_congestion(e):
+                        for limit in (self.overall, host):
+                            limit.on_congestion()
+                        logger.debug(f"Congestion on {url} ({e}), limits now "
+                                     f"{self.overall.current} overall / {host.current} for the host")
+                    else:
+                        self.overall.on_error()
+                        host.on_error()
+                    raise
+                latency = time.monotonic() - started
+                await self.overall.on_success(latency)
+                await host.on_success(latency)
+            finally:
+                await host.release()
+        finally:
+            await self.overall.release()
+
+    def describe(self, hosts: int = 3) -> str:
+        """Short description of the current limits for progress output."""
+        busiest = sorted(self.hosts.items(), key=lambda item: item[1].in_use, reverse=True)[:hosts]
+        per_host = ", ".join(f"{host} {limit.current}" for host, limit in busiest)
+        return f"limit {self.overall.current}/{self.maximum}" + (f" ({per_host})" if per_host else "")
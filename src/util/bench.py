@@ -0,0 +1,186 @@
+"""Synthetic sites and result comparison for offline scraper benchmarks."""
+import json
+import multiprocessing
+import os
+import platform
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from util.logging import logger
+
+DEFAULT_TOLERANCE = 0.1
+
+# Result metrics compared against a baseline, and whether a larger value is better
+COMPARED_METRICS = {
+    "pages_per_sec": True,
+    "latency_p50": False,
+    "latency_p99": False,
+    "cpu_time": False,
+    "peak_rss_mb": False,
+}
+
+FILLER = b"Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt. "
+
+
+@dataclass
+class SiteSpec:
+    """Shape of a generated site; the same spec and seed always produce the same site."""
+    name: str
+    pages: int = 500
+    fanout: int = 8
+    page_bytes: int = 16 * 1024
+    latency_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+SCENARIOS = {
+    spec.name: spec for spec in (
+        SiteSpec("small"),
+        SiteSpec("wide", pages=5000, fanout=30, page_bytes=8 * 1024),
+        SiteSpec("large-pages", pages=300, page_bytes=512 * 1024),
+        SiteSpec("slow", latency_ms=50.0),
+        SiteSpec("flaky", error_rate=0.1),
+    )
+}
+
+
+def render_page(spec: SiteSpec, index: int) -> tuple[int, bytes]:
+    """
+    Return the status and body of page `index` of a site.
+
+    Pages form a tree with `fanout` children each so every page is reachable
+    from page 0; pages with fewer children are topped up with seeded random
+    links back into the site, which exercises deduplication.
+    """
+    rng = random.Random(spec.seed * 1_000_003 + index)
+    if index > 0 and rng.random() < spec.error_rate:
+        return 500, b"<html><body>Internal Server Error</body></html>"
+    children = [child for child in range(index * spec.fanout + 1, (index + 1) * spec.fanout + 1)
+                if child < spec.pages]
+    while len(children) < spec.fanout:
+        children.append(rng.randrange(spec.pages))
+    links = "".join(f'<li><a href="/p{child}.html">Page {child}</a></li>' for child in children)
+    head = f"<!DOCTYPE html><html><head><title>Page {index}</title></head><body><ul>{links}</ul><p>".encode()
+    tail = b"</p></body></html>"
+    padding = max(spec.page_bytes - len(head) - len(tail), 0)
+    filler = (FILLER * (padding // len(FILLER) + 1))[:padding]
+    return 200, head + filler + tail
+
+
+class SyntheticSite:
+    """Serves a generated site from a background thread on an ephemeral localhost port."""
+
+    def __init__(self, spec: SiteSpec):
+        self.spec = spec
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like real servers
+
+            def do_GET(self):  # noqa: N802
+                if spec.latency_ms:
+                    time.sleep(spec.latency_ms / 1000)
+                status, body, content_type = 404, b"Not Found", "text/plain"
+                name = self.path.split("?", 1)[0]
+                if name == "/":
+                    name = "/p0.html"
+                if name.startswith("/p") and name.endswith(".html") and name[2:-5].isdigit():
+                    index = int(name[2:-5])
+                    if index < spec.pages:
+                        status, body = render_page(spec, index)
+                        content_type = "text/html; charset=utf-8"
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Root URL of the site."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self._thread.start()
+        logger.debug(f"Serving synthetic site {self.spec.name} at {self.url}")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def run_isolated(func, *args):
+    """
+    Run `func(*args)` in a fresh interpreter and return its result.
+
+    Every benchmark run gets its own process so peak RSS and CPU time are not
+    polluted by earlier runs.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
+
+
+def environment() -> dict:
+    """Describe the machine a benchmark ran on."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def spec_dict(spec: SiteSpec) -> dict:
+    """Return a JSON-friendly copy of a spec."""
+    return asdict(spec)
+
+
+def load_results(path: str | Path) -> dict:
+    """Read a benchmark result file, e.g. a saved baseline."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[dict]:
+    """
+    Compare scenario results against a baseline.
+
+    Returns one row per scenario and metric present in both; a row is marked
+    regressed when the metric got worse by more than `tolerance` (a fraction).
+    """
+    rows = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if previous.get("spec") != current.get("spec"):
+            logger.warning(f"Scenario {name} changed since the baseline, comparing anyway")
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            rows.append({
+                "scenario": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": round(change, 4),
+                "regressed": worse > tolerance,
+            })
+    return rows
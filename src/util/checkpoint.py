@@ -0,0 +1,158 @@
+"""Crawl checkpointing so long crawls can be resumed."""
+import asyncio
+import glob
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from util.config import CACHE_DIR
+from util.logging import logger
+
+CRAWL_DIR = CACHE_DIR / "crawls"
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+DEFAULT_KEEP_CRAWLS = 20
+
+
+def new_crawl_id(start_url: str) -> str:
+    """Build a readable crawl id from the start host and the current time."""
+    host = re.sub(r"[^A-Za-z0-9.-]", "_", urlsplit(start_url).netloc) or "crawl"
+    return f"{host}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+
+
+def prune_crawls(keep: int, directory: str | Path = CRAWL_DIR, current: str | None = None) -> int:
+    """
+    Delete every crawl in `directory` but the `keep` most recently written, and return how many went.
+
+    All files named after a crawl id go with it: the checkpoint, its SQLite
+    journal and the link graph saved next to it. `current` is never deleted,
+    and `keep` of 0 keeps everything.
+    """
+    if keep <= 0:
+        return 0
+    checkpoints = sorted(Path(directory).glob("*.sqlite"), key=lambda path: path.stat().st_mtime, reverse=True)
+    removed = 0
+    for path in checkpoints[keep:]:
+        if path.stem == current:
+            continue
+        for file in path.parent.glob(f"{glob.escape(path.stem)}.*"):
+            file.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+class CrawlCheckpoint:
+    """
+    Incremental SQLite checkpoint of a crawl's frontier and visited set.
+
+    The scraper records events synchronously into in-memory buffers; a background
+    task flushes them in batches from a worker thread, so fetch workers never wait
+    on disk I/O.
+    """
+
+    def __init__(self, crawl_id: str, directory: str | Path = CRAWL_DIR, resume: bool = False):
+        self.crawl_id = crawl_id
+        self.path = Path(directory) / f"{crawl_id}.sqlite"
+        if resume and not self.path.exists():
+            raise FileNotFoundError(f"No checkpoint found for crawl {crawl_id} ({self.path})")
+        self.resumed = resume
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Only one flush runs at a time, but it runs on an executor thread
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS frontier"
+            " (url TEXT PRIMARY KEY, depth INTEGER, check_only INTEGER, source TEXT) WITHOUT ROWID"
+        )
+        # Keyed by URL, so the table doubles as a sorted on-disk index for `util scrape diff`
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS visited"
+            " (url TEXT PRIMARY KEY, success INTEGER, status INTEGER, links INTEGER) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(visited)")}
+        for column in ("status", "links"):
+            if column not in columns:
+                # Checkpoints from before the diff columns existed
+                self._db.execute(f"ALTER TABLE visited ADD COLUMN {column} INTEGER")
+        self._db.commit()
+        self._enqueued = []
+        self._done = []
+        self._writing = None
+
+    def save_meta(self, **options):
+        """Persist the crawl options needed to resume it."""
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in options.items()],
+        )
+        self._db.commit()
+
+    def load_meta(self) -> dict:
+        """Return the crawl options saved with `save_meta`."""
+        return {key: json.loads(value) for key, value in self._db.execute("SELECT key, value FROM meta")}
+
+    def visited(self):
+        """Iterate over (url, success) for every completed URL."""
+        for url, success in self._db.execute("SELECT url, success FROM visited"):
+            yield url, bool(success)
+
+    def frontier(self):
+        """Iterate over (url, depth, check_only, source) for URLs that were queued but not completed."""
+        for url, depth, check_only, source in self._db.execute(
+            "SELECT url, depth, check_only, source FROM frontier"
+        ):
+            yield url, depth, bool(check_only), source
+
+    def record_enqueued(self, url: str, depth: int, check_only: bool = False, source: str | None = None):
+        """Note that a URL entered the frontier."""
+        self._enqueued.append((url, depth, int(check_only), source))
+
+    def record_done(self, url: str, success: bool | None, status: int | None = None,
+                    links: int | None = None, queued: str | None = None):
+        """
+        Note that a URL left the frontier; `None` means it was skipped, not fetched.
+
+        `status` is the HTTP status if there was one and `links` a digest of the
+        page's outgoing links (see `util.crawldiff.links_digest`). `queued` is the
+        frontier entry it was fetched as, when that differs from the visited key `url`.
+        """
+        self._done.append((url, success, status, links, queued or url))
+
+    def _write(self, enqueued, done):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO frontier (url, depth, check_only, source) VALUES (?, ?, ?, ?)", enqueued
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO visited (url, success, status, links) VALUES (?, ?, ?, ?)",
+                [(url, int(success), status, links) for url, success, status, links, _ in done if success is not None],
+            )
+            self._db.executemany("DELETE FROM frontier WHERE url = ?", [(entry[4],) for entry in done])
+
+    async def flush(self):
+        """Write buffered events to disk without blocking the event loop."""
+        # A write interrupted by cancellation keeps running on its thread; let it finish first
+        if self._writing is not None:
+            await asyncio.shield(self._writing)
+        if not self._enqueued and not self._done:
+            return
+        enqueued, self._enqueued = self._enqueued, []
+        done, self._done = self._done, []
+        self._writing = asyncio.ensure_future(asyncio.to_thread(self._write, enqueued, done))
+        await asyncio.shield(self._writing)
+        logger.debug(f"Checkpointed {len(enqueued)} enqueued / {len(done)} done to {self.path}")
+
+    async def run(self, interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        """Flush periodically until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self):
+        """Flush any remaining events and close the database."""
+        await self.flush()
+        self._db.close()
@@ -10,6 +10,7 @@ from util.logging import logger
 
 home = Path.home()
 CONFIG_FILE = f"{home}/.utilrc"
+CACHE_DIR = home / ".cache" / "util"
 
 # Export the config_file for backwards compatibility  
 # pylint: disable=invalid-name
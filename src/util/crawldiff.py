@@ -0,0 +1,89 @@
+"""Streaming comparison of two checkpointed crawls."""
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from util.checkpoint import CRAWL_DIR
+
+# Kinds of difference, in display order
+CHANGES = ("added", "removed", "broke", "fixed", "status", "links")
+
+# Rows fetched from each crawl at a time
+FETCH_SIZE = 10_000
+
+
+def links_digest(links) -> int:
+    """Order-independent 64-bit digest of a page's canonical links, as a signed SQLite integer."""
+    digest = hashlib.blake2b("\n".join(sorted(set(links))).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def checkpoint_path(crawl: str) -> Path:
+    """Return the checkpoint database for a crawl id, or `crawl` itself if it is a path."""
+    path = Path(crawl)
+    if path.exists():
+        return path
+    return CRAWL_DIR / f"{crawl}.sqlite"
+
+
+def _rows(path: Path):
+    """Yield (url, success, status, links) for every visited URL in URL order."""
+    # Callers may advance the generator from different executor threads, one at a time
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        columns = {row[1] for row in db.execute("PRAGMA table_info(visited)")}
+        if not columns:
+            raise ValueError(f"{path} is not a crawl checkpoint")
+        # Older checkpoints have no status or link digests to compare
+        select = ", ".join(column if column in columns else "NULL" for column in ("status", "links"))
+        # The primary key keeps rows in URL order, so this is a straight index scan with no sort
+        cursor = db.execute(f"SELECT url, success, {select} FROM visited ORDER BY url")
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            yield from rows
+    finally:
+        db.close()
+
+
+def _same_status(before: int | None, after: int | None) -> bool:
+    if before == after or before is None or after is None:
+        return True
+    # A 304 is the cached version of whatever 2xx the page returned before
+    return 304 in (before, after) and 200 <= min(before, after) < 300
+
+
+def diff_crawls(before: str | Path, after: str | Path):
+    """
+    Yield (change, url, before_status, after_status) for every URL that differs between two crawls.
+
+    Both checkpoints are read in URL order and merged like sorted files, so
+    memory use doesn't depend on crawl size. `change` is one of `CHANGES`:
+    a URL only in the later crawl is "added", one only in the earlier crawl
+    "removed"; "broke" and "fixed" are fetches that started failing or
+    succeeding, "status" another status change and "links" a page whose
+    outgoing links changed. Statuses are None when unknown.
+    """
+    rows_a = _rows(Path(before))
+    rows_b = _rows(Path(after))
+    a = next(rows_a, None)
+    b = next(rows_b, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[0] < b[0]):
+            yield "removed", a[0], a[2], None
+            a = next(rows_a, None)
+            continue
+        if a is None or b[0] < a[0]:
+            yield "added", b[0], None, b[2]
+            b = next(rows_b, None)
+            continue
+        url, success_a, status_a, links_a = a
+        _, success_b, status_b, links_b = b
+        if success_a and not success_b:
+            yield "broke", url, status_a, status_b
+        elif success_b and not success_a:
+            yield "fixed", url, status_a, status_b
+        elif not _same_status(status_a, status_b):
+            yield "status", url, status_a, status_b
+        elif links_a is not None and links_b is not None and links_a != links_b:
+            yield "links", url, status_a, status_b
+        a = next(rows_a, None)
+        b = next(rows_b, None)
@@ -0,0 +1,142 @@
+"""Content fingerprints for spotting duplicate and near-duplicate pages."""
+import hashlib
+import re
+from collections import OrderedDict
+
+DEFAULT_DEDUP_DISTANCE = 3
+DEFAULT_DEDUP_ENTRIES = 10_000
+
+SIMHASH_BITS = 64
+# Features hashed per page; larger pages are sampled down to roughly this many
+MAX_FEATURES = 1024
+
+_TAG = re.compile(rb"<script\b.*?</script>|<style\b.*?</style>|<[^>]*>", re.IGNORECASE | re.DOTALL)
+_WORD = re.compile(rb"\w+")
+_HREF = re.compile(rb"""href\s*=\s*["']?([^"'\s>?#]+)""", re.IGNORECASE)
+
+# SimHash needs, for every bit position, how many feature hashes have that bit set.
+# Rather than looping over 64 bits per feature, each hash byte is "spread" through
+# a lookup table into eight 32-bit lanes of one big int, so summing the spread
+# values adds up all 64 per-bit counters at once.
+_LANE_BITS = 32
+_SPREAD = [
+    [sum(1 << ((byte_index * 8 + bit) * _LANE_BITS) for bit in range(8) if value >> bit & 1) for value in range(256)]
+    for byte_index in range(SIMHASH_BITS // 8)
+]
+_LANE_MASK = (1 << _LANE_BITS) - 1
+
+
+def link_base(url: str) -> str:
+    """
+    Return the part of a page URL its relative links depend on: everything before the query.
+
+    Relative links only resolve to the same URLs on two pages that share it
+    (apart from empty and fragment-only links, which point at the page itself).
+    """
+    return url.split("#", 1)[0].split("?", 1)[0]
+
+
+def content_digest(body: bytes) -> bytes:
+    """Exact fingerprint of a body."""
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+def simhash(body: bytes) -> int:
+    """
+    64-bit SimHash of an HTML body.
+
+    Features are the distinct visible words plus every link target without its
+    query string, so pages that share a template but link elsewhere stay apart
+    while mirrors that differ only in session parameters or small edits get
+    fingerprints a few bits apart. Large pages are sampled down to about
+    `MAX_FEATURES` features by hash value, which keeps the same features on
+    every page. Features are hashed with Python's `hash`, so fingerprints are
+    only comparable within one process.
+    """
+    features = set(_WORD.findall(_TAG.sub(b" ", body).lower()))
+    features.update(b"href " + target for target in _HREF.findall(body))
+    hashes = list(map(hash, features))
+    step = len(hashes) // MAX_FEATURES + 1
+    if step > 1:
+        hashes = [value for value in hashes if value % step == 0]
+    counts = 0
+    spread = _SPREAD
+    for value in hashes:
+        counts += (spread[0][value & 0xFF] + spread[1][value >> 8 & 0xFF] + spread[2][value >> 16 & 0xFF]
+                   + spread[3][value >> 24 & 0xFF] + spread[4][value >> 32 & 0xFF] + spread[5][value >> 40 & 0xFF]
+                   + spread[6][value >> 48 & 0xFF] + spread[7][value >> 56 & 0xFF])
+    threshold = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if (counts >> (bit * _LANE_BITS) & _LANE_MASK) > threshold:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class ContentIndex:
+    """
+    Remembers the link sets of recently fetched pages by content fingerprint.
+
+    A page matches if its exact digest was seen, or if its SimHash is within
+    `distance` bits of a seen one. Near matches are found by splitting the
+    fingerprint into `distance + 1` blocks: two fingerprints that close must
+    agree exactly on at least one block, so only pages sharing a block are
+    compared. The oldest entries are dropped past `max_entries`.
+
+    Links are stored resolved, so a page only matches entries recorded under
+    the same `link_base`; a mirror at another path has to be parsed itself.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_DEDUP_ENTRIES, distance: int = DEFAULT_DEDUP_DISTANCE):
+        self.max_entries = max_entries
+        self.distance = distance
+        self._blocks = distance + 1
+        self._block_bits = -(-SIMHASH_BITS // self._blocks)
+        self._entries = OrderedDict()  # digest -> (fingerprint, links, assets, base)
+        self._by_block = [{} for _ in range(self._blocks)]  # block value -> set of digests
+        self.exact = 0
+        self.near = 0
+
+    def _block_keys(self, fingerprint: int):
+        mask = (1 << self._block_bits) - 1
+        for index in range(self._blocks):
+            yield index, fingerprint >> (index * self._block_bits) & mask
+
+    def lookup(self, digest: bytes, fingerprint: int, assets: bool = False,
+               base: str | None = None) -> tuple[str, list[str], list[str] | None] | None:
+        """
+        Return ("exact" | "near", links, assets) for a matching page, or None.
+
+        With `assets` set, pages remembered without their assets don't match.
+        `base` is the page's `link_base`; pages remembered under another base don't match.
+        """
+        entry = self._entries.get(digest)
+        if entry is not None and not (assets and entry[2] is None) and entry[3] == base:
+            self._entries.move_to_end(digest)
+            self.exact += 1
+            return "exact", entry[1], entry[2]
+        for index, key in self._block_keys(fingerprint):
+            for candidate in self._by_block[index].get(key, ()):
+                other = self._entries[candidate]
+                if (assets and other[2] is None) or other[3] != base:
+                    continue
+                if (other[0] ^ fingerprint).bit_count() <= self.distance:
+                    self.near += 1
+                    return "near", other[1], other[2]
+        return None
+
+    def add(self, digest: bytes, fingerprint: int, links: list[str], assets: list[str] | None,
+            base: str | None = None):
+        """Remember a page's links (and assets, or None if they weren't collected) resolved against `base`."""
+        if digest in self._entries:
+            return
+        self._entries[digest] = (fingerprint, links, assets, base)
+        for index, key in self._block_keys(fingerprint):
+            self._by_block[index].setdefault(key, set()).add(digest)
+        if len(self._entries) > self.max_entries:
+            old_digest, (old_fingerprint, *_) = self._entries.popitem(last=False)
+            for index, key in self._block_keys(old_fingerprint):
+                block = self._by_block[index][key]
+                block.discard(old_digest)
+                if not block:
+                    del self._by_block[index][key]
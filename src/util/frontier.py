@@ -0,0 +1,182 @@
+"""Bounded-memory crawl frontier and visited set."""
+import asyncio
+import collections
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import tempfile
+from pathlib import Path
+
+from util.config import CACHE_DIR
+from util.logging import logger
+
+FRONTIER_DIR = CACHE_DIR / "frontier"
+DEFAULT_FRONTIER_MEMORY = 100_000
+DEFAULT_VISITED_CAPACITY = 10_000_000
+
+
+class BloomFilter:
+    """
+    Probabilistic set of strings with no false negatives.
+
+    Sized for `capacity` items at false-positive rate `fpr`; about 1.2 bytes per
+    item at 1%. Membership answers can be wrong only by claiming an item was
+    added when it wasn't, and that rate grows once `capacity` is exceeded.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_VISITED_CAPACITY, fpr: float = 0.01):
+        if not 0 < fpr < 1:
+            raise ValueError(f"False-positive rate must be between 0 and 1, got {fpr}")
+        self.capacity = capacity
+        self.fpr = fpr
+        self.bits = max(8, math.ceil(-capacity * math.log(fpr) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, item: str):
+        """Add an item to the set."""
+        for position in self._positions(item):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        if self.count == self.capacity + 1:
+            logger.warning(f"Bloom filter is over its capacity of {self.capacity}, "
+                           f"false positives will exceed {self.fpr:g}")
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size_bytes(self) -> int:
+        """Memory used by the bit array."""
+        return len(self._array)
+
+
+class SpillingQueue(asyncio.Queue):
+    """
+    FIFO asyncio queue that keeps at most `memory_items` entries in memory.
+
+    Once the in-memory part is full, new entries are appended to a temporary
+    JSON-lines file and read back in batches as the in-memory part drains, so
+    order is preserved. Entries must be JSON-serialisable tuples; they come
+    back as `item_type(*fields)`, or plain tuples without an `item_type`.
+    """
+
+    def __init__(self, memory_items: int = DEFAULT_FRONTIER_MEMORY, directory: str | Path = FRONTIER_DIR,
+                 item_type=None):
+        self.memory_items = max(1, memory_items)
+        self.directory = Path(directory)
+        self.item_type = item_type
+        self._spill = None
+        self._spilled = 0  # entries on disk not yet read back
+        self._read_offset = 0
+        self.spilled_total = 0
+        super().__init__()
+
+    def _init(self, maxsize):
+        self._queue = collections.deque()
+
+    def qsize(self) -> int:
+        return len(self._queue) + self._spilled
+
+    def empty(self) -> bool:
+        return not self._queue and not self._spilled
+
+    def _put(self, item):
+        # Once anything is on disk, newer entries must queue behind it
+        if not self._spilled and len(self._queue) < self.memory_items:
+            self._queue.append(item)
+            return
+        self._write_spill(item)
+
+    def _write_spill(self, item):
+        if self._spill is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._spill = tempfile.TemporaryFile(dir=self.directory, prefix="frontier-")
+            logger.debug(f"Frontier exceeded {self.memory_items} entries, spilling to disk")
+        self._spill.seek(0, 2)
+        self._spill.write(json.dumps(list(item), separators=(",", ":")).encode("utf-8") + b"\n")
+        self._spilled += 1
+        self.spilled_total += 1
+
+    def _get(self):
+        if not self._queue:
+            self._refill()
+        return self._queue.popleft()
+
+    def _refill(self):
+        self._queue.extend(self._read_spill())
+
+    def _read_spill(self) -> list:
+        self._spill.seek(self._read_offset)
+        items = []
+        # Read back in batches of half the memory budget to amortise the seeks
+        for _ in range(min(self._spilled, max(1, self.memory_items // 2))):
+            line = self._spill.readline()
+            fields = json.loads(line)
+            items.append(self.item_type(*fields) if self.item_type is not None else tuple(fields))
+            self._spilled -= 1
+        self._read_offset = self._spill.tell()
+        if not self._spilled:
+            # Everything has been read back, so the file can start over
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._read_offset = 0
+        return items
+
+    def close(self):
+        """Delete the spill file."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+class PriorityFrontier(SpillingQueue):
+    """
+    Crawl frontier that hands out the entry with the lowest `score(item)` first.
+
+    Ties go first in, first out. Past `memory_items` entries, the worse-scored
+    half of the heap is spilled to disk and read back once the in-memory entries
+    run out, so the order is exact in memory and approximate across a spill.
+    """
+
+    def __init__(self, score, memory_items: int = DEFAULT_FRONTIER_MEMORY, directory: str | Path = FRONTIER_DIR,
+                 item_type=None):
+        self.score = score
+        self._order = itertools.count()
+        super().__init__(memory_items, directory, item_type)
+
+    def _init(self, maxsize):
+        self._queue = []  # heap of (score, order, item)
+
+    def _put(self, item):
+        heapq.heappush(self._queue, (self.score(item), next(self._order), item))
+        if len(self._queue) > self.memory_items:
+            # A sorted list is a valid heap, so keeping its head needs no re-heapify
+            self._queue.sort()
+            keep = max(1, self.memory_items // 2)
+            for _, _, spilled in self._queue[keep:]:
+                self._write_spill(spilled)
+            del self._queue[keep:]
+
+    def _get(self):
+        if not self._queue:
+            self._refill()
+        return heapq.heappop(self._queue)[2]
+
+    def _refill(self):
+        for item in self._read_spill():
+            heapq.heappush(self._queue, (self.score(item), next(self._order), item))
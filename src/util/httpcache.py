@@ -0,0 +1,156 @@
+"""Persistent HTTP validator cache for incremental re-crawls."""
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from util.config import CACHE_DIR
+from util.logging import logger
+
+DEFAULT_CACHE_FILE = CACHE_DIR / "scrape-cache.sqlite"
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Seconds between background flushes; a crash loses at most this much of the cache
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+
+@dataclass
+class CachedPage:
+    """Validators and extracted links for a previously fetched page."""
+    etag: str | None
+    last_modified: str | None
+    links: list[str]
+    assets: list[str] | None = None  # None when assets were not collected
+
+    def conditional_headers(self) -> dict[str, str]:
+        """Return the request headers that revalidate this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ValidatorCache:
+    """
+    SQLite-backed store of ETag / Last-Modified validators and link lists, keyed by canonical URL.
+
+    Entries are evicted least-recently-used first once their total size exceeds `max_bytes`.
+    Writes are buffered in memory and flushed in batches from a worker thread, and
+    lookups run on a worker thread too, so fetches never wait on SQLite in the event loop.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CACHE_FILE, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Used from worker threads, one at a time under `_lock`
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, links TEXT,"
+            " size INTEGER, accessed REAL, assets TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "assets" not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN assets TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self._puts = {}  # url -> row not yet written
+        self._touches = {}  # url -> access time not yet written
+        self._writing = None
+
+    @staticmethod
+    def _entry(etag, last_modified, links, assets) -> CachedPage:
+        return CachedPage(
+            etag, last_modified, links.split("\n") if links else [],
+            None if assets is None else (assets.split("\n") if assets else [])
+        )
+
+    def _read(self, url: str):
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, links, assets FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    async def get(self, url: str) -> CachedPage | None:
+        """Return the cached entry for a URL, if any."""
+        pending = self._puts.get(url)
+        if pending is not None:
+            _, etag, last_modified, links, _, _, assets = pending
+            return self._entry(etag, last_modified, links, assets)
+        row = await asyncio.to_thread(self._read, url)
+        return self._entry(*row) if row is not None else None
+
+    def touch(self, url: str):
+        """Mark an entry as used after it was revalidated."""
+        self.hits += 1
+        self._touches[url] = time.time()
+
+    def put(self, url: str, etag: str | None, last_modified: str | None, links: list[str],
+            assets: list[str] | None = None):
+        """Store the validators, links and assets for a URL; written on the next flush."""
+        packed = "\n".join(links)
+        packed_assets = None if assets is None else "\n".join(assets)
+        size = len(url) + len(packed) + len(packed_assets or "") + len(etag or "") + len(last_modified or "")
+        self._puts[url] = (url, etag, last_modified, packed, size, time.time(), packed_assets)
+
+    def _write(self, puts: list[tuple], touches: list[tuple]):
+        with self._lock, self._db:
+            for row in puts:
+                old = self._db.execute("SELECT size FROM pages WHERE url = ?", (row[0],)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO pages (url, etag, last_modified, links, size, accessed, assets)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", row,
+                )
+                self._size += row[4] - (old[0] if old else 0)
+            self._db.executemany("UPDATE pages SET accessed = ? WHERE url = ?", touches)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction doesn't run on every flush
+        target = self.max_bytes * 0.9
+        removed = 0
+        while self._size > target:
+            rows = self._db.execute("SELECT url, size FROM pages ORDER BY accessed LIMIT 500").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                if self._size <= target:
+                    break
+                self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._size -= size
+                removed += 1
+        logger.debug(f"Evicted {removed} entries from {self.path}")
+
+    async def flush(self):
+        """Write buffered entries to disk without blocking the event loop."""
+        # A write interrupted by cancellation keeps running on its thread; let it finish first
+        if self._writing is not None:
+            await asyncio.shield(self._writing)
+        if not self._puts and not self._touches:
+            return
+        puts, self._puts = list(self._puts.values()), {}
+        touches, self._touches = [(accessed, url) for url, accessed in self._touches.items()], {}
+        self._writing = asyncio.ensure_future(asyncio.to_thread(self._write, puts, touches))
+        await asyncio.shield(self._writing)
+
+    async def run(self, interval: float = DEFAULT_FLUSH_INTERVAL):
+        """Flush periodically until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def close(self):
+        """Flush pending writes and close the database."""
+        await self.flush()
+        self._db.close()
@@ -0,0 +1,207 @@
+"""Compact link graph of a crawl, for finding who links to what."""
+import heapq
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+
+from util.checkpoint import CRAWL_DIR
+
+GRAPH_SUFFIX = ".graph"
+_MAGIC = b"UTILGRAPH1\n"
+
+# Bit flags kept per URL
+OK = 1
+FAILED = 2
+LINKED = 4  # the page's outgoing links have been recorded
+
+
+def graph_path(crawl: str) -> Path:
+    """Return the graph file for a crawl id, or `crawl` itself if it is a path."""
+    path = Path(crawl)
+    if path.exists():
+        return path
+    return CRAWL_DIR / f"{crawl}{GRAPH_SUFFIX}"
+
+
+class LinkGraph:
+    """
+    Page to link edges of a crawl, with every URL interned to an integer id.
+
+    Each page's outgoing links are appended as one run of ids to a flat
+    `array`, indexed by per-page offsets (a compressed sparse row layout), so
+    an edge costs 4 bytes and a URL costs one dict slot on top of the string
+    the visited set already holds. The reverse adjacency used to look up
+    referrers is built the same way, on demand, when the graph is analysed.
+    """
+
+    def __init__(self):
+        self._ids = {}  # url -> id
+        self.urls = []  # id -> url
+        self.flags = bytearray()
+        self.status = array("H")  # last HTTP status per id, 0 if none
+        self.roots = set()  # ids crawled without a referrer, e.g. the start URL
+        self.pages = array("I")  # source id of each run of links
+        self.offsets = array("Q", [0])  # run i is targets[offsets[i]:offsets[i + 1]]
+        self.targets = array("I")
+        self._reverse = None
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def edges(self) -> int:
+        """Number of page to link edges."""
+        return len(self.targets)
+
+    @property
+    def size_bytes(self) -> int:
+        """Memory used by the edge and per-URL arrays, excluding the URL strings."""
+        arrays = (self.status, self.pages, self.offsets, self.targets)
+        return len(self.flags) + sum(len(values) * values.itemsize for values in arrays)
+
+    def intern(self, url: str) -> int:
+        """Return the id of a URL, assigning the next one on first sight."""
+        node = self._ids.get(url)
+        if node is None:
+            node = self._ids[url] = len(self.urls)
+            self.urls.append(url)
+            self.flags.append(0)
+            self.status.append(0)
+        return node
+
+    def add_root(self, url: str):
+        """Mark a URL as an entry point, so it never counts as an orphan."""
+        self.roots.add(self.intern(url))
+
+    def add_links(self, source: str, targets):
+        """Record the canonical links found on `source`; only the first call per page counts."""
+        node = self.intern(source)
+        if self.flags[node] & LINKED:
+            return
+        self.flags[node] |= LINKED
+        intern = self.intern
+        # dict.fromkeys keeps first-seen order while dropping repeated links
+        ids = dict.fromkeys(intern(target) for target in targets if target is not None)
+        ids.pop(node, None)  # a page linking to itself isn't a referrer worth reporting
+        self.pages.append(node)
+        self.targets.extend(ids)
+        self.offsets.append(len(self.targets))
+        self._reverse = None
+
+    def mark(self, url: str, ok: bool, status: int | None = None):
+        """Record the outcome of fetching a URL."""
+        node = self.intern(url)
+        self.flags[node] = (self.flags[node] & LINKED) | (OK if ok else FAILED)
+        self.status[node] = status or 0
+
+    def merge(self, other: "LinkGraph"):
+        """Add another graph's URLs and edges, e.g. from another shard of the same crawl."""
+        for node, url in enumerate(other.urls):
+            if other.flags[node] & (OK | FAILED):
+                self.mark(url, bool(other.flags[node] & OK), other.status[node])
+        for node in other.roots:
+            self.add_root(other.urls[node])
+        for run, page in enumerate(other.pages):
+            start, end = other.offsets[run], other.offsets[run + 1]
+            self.add_links(other.urls[page], [other.urls[target] for target in other.targets[start:end]])
+
+    def _reverse_index(self) -> tuple[array, array]:
+        """Build (offsets, sources) so sources[offsets[id]:offsets[id + 1]] are the pages linking to id."""
+        if self._reverse is not None:
+            return self._reverse
+        counts = array("I", bytes(4 * (len(self.urls) + 1)))
+        for target in self.targets:
+            counts[target + 1] += 1
+        offsets = array("Q", bytes(8 * (len(self.urls) + 1)))
+        total = 0
+        for node in range(len(self.urls) + 1):
+            total += counts[node]
+            offsets[node] = total
+        # Counting sort of the edges by target, filling each target's slots in page order
+        cursor = array("Q", offsets)
+        sources = array("I", bytes(4 * len(self.targets)))
+        for run, page in enumerate(self.pages):
+            for index in range(self.offsets[run], self.offsets[run + 1]):
+                target = self.targets[index]
+                sources[cursor[target]] = page
+                cursor[target] += 1
+        self._reverse = (offsets, sources)
+        return self._reverse
+
+    def in_degree(self, node: int) -> int:
+        """Number of distinct pages linking to a URL id."""
+        offsets, _ = self._reverse_index()
+        return offsets[node + 1] - offsets[node]
+
+    def referrers(self, url: str) -> list[str]:
+        """URLs of the pages linking to `url`."""
+        node = self._ids.get(url)
+        if node is None:
+            return []
+        offsets, sources = self._reverse_index()
+        return [self.urls[source] for source in sources[offsets[node]:offsets[node + 1]]]
+
+    def broken(self) -> list[tuple[str, int, list[str]]]:
+        """(url, status, referrers) for every URL that failed, most referenced first."""
+        failed = [node for node, flags in enumerate(self.flags) if flags & FAILED]
+        failed.sort(key=self.in_degree, reverse=True)
+        return [(self.urls[node], self.status[node], self.referrers(self.urls[node])) for node in failed]
+
+    def most_linked(self, count: int = 20) -> list[tuple[str, int]]:
+        """The `count` URLs with the most referring pages."""
+        top = heapq.nlargest(count, range(len(self.urls)), key=self.in_degree)
+        return [(self.urls[node], self.in_degree(node)) for node in top]
+
+    def orphans(self) -> list[str]:
+        """Pages fetched successfully that no crawled page links to (sitemap-only pages, say)."""
+        return [
+            self.urls[node] for node, flags in enumerate(self.flags)
+            if flags & OK and node not in self.roots and self.in_degree(node) == 0
+        ]
+
+    def save(self, path: str | Path):
+        """Atomically write the graph to a compact binary file."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = {
+            "byteorder": sys.byteorder,
+            "urls": len(self.urls),
+            "pages": len(self.pages),
+            "edges": len(self.targets),
+            "roots": sorted(self.roots),
+        }
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n")
+            f.write(self.flags)
+            for values in (self.status, self.pages, self.offsets, self.targets):
+                values.tofile(f)
+            f.write("\n".join(self.urls).encode("utf-8"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "LinkGraph":
+        """Read a graph written by `save`."""
+        graph = cls()
+        with open(path, "rb") as f:
+            if f.readline() != _MAGIC:
+                raise ValueError(f"{path} is not a link graph file")
+            header = json.loads(f.readline())
+            graph.flags = bytearray(f.read(header["urls"]))
+            graph.status = array("H")
+            graph.pages = array("I")
+            graph.offsets = array("Q")
+            graph.targets = array("I")
+            for values, count in ((graph.status, header["urls"]), (graph.pages, header["pages"]),
+                                  (graph.offsets, header["pages"] + 1), (graph.targets, header["edges"])):
+                values.fromfile(f, count)
+                if header["byteorder"] != sys.byteorder:
+                    values.byteswap()
+            text = f.read().decode("utf-8")
+        graph.urls = text.split("\n") if header["urls"] else []
+        graph._ids = {url: node for node, url in enumerate(graph.urls)}
+        graph.roots = set(header["roots"])
+        return graph
@@ -0,0 +1,176 @@
+"""Incremental HTML link extraction."""
+import asyncio
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Tags whose URL attribute points at a page asset rather than another page
+ASSET_ATTRS = {"img": "src", "script": "src", "link": "href"}
+# <link> relations that name an origin to warm up rather than a resource to fetch
+IGNORED_LINK_RELS = {"preconnect", "dns-prefetch"}
+
+
+def parse_content_type(header: str | None) -> tuple[str, str | None]:
+    """Split a Content-Type header into its lowercase media type and charset."""
+    if not header:
+        return "", None
+    media_type, _, params = header.partition(";")
+    charset = None
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            charset = value.strip().strip('"\'')
+    return media_type.strip().lower(), charset
+
+
+def is_html(header: str | None) -> bool:
+    """Return True if a Content-Type header may carry HTML (missing counts as HTML)."""
+    media_type, _ = parse_content_type(header)
+    return not media_type or media_type in HTML_CONTENT_TYPES
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Streaming tokenizer that collects absolute `<a href>` links.
+
+    Feed it raw body chunks as they arrive; each call to `feed_bytes` returns
+    the links completed by that chunk, so no DOM is ever built. With `assets`
+    set, `img`/`script`/`link` URLs are also collected into `self.assets`.
+    """
+
+    def __init__(self, base_url: str, encoding: str | None = None, assets: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.collect_assets = assets
+        self.assets = []
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self._pending.append(urljoin(self.base_url, value.strip()))
+                    break
+        elif self.collect_assets and tag in ASSET_ATTRS:
+            attrs = dict(attrs)
+            value = attrs.get(ASSET_ATTRS[tag])
+            if tag == "link" and set((attrs.get("rel") or "").lower().split()) & IGNORED_LINK_RELS:
+                return
+            if value and not value.startswith("data:"):
+                self.assets.append(urljoin(self.base_url, value.strip()))
+
+    def _drain(self) -> list[str]:
+        links, self._pending = self._pending, []
+        return links
+
+    def feed_bytes(self, chunk: bytes) -> list[str]:
+        """Feed a chunk of the raw body and return the links it completed."""
+        self.feed(self._decoder.decode(chunk))
+        return self._drain()
+
+    def finish(self) -> list[str]:
+        """Flush any buffered input and return the remaining links."""
+        self.feed(self._decoder.decode(b"", final=True))
+        self.close()
+        return self._drain()
+
+
+def extract_links(body: bytes, base_url: str, encoding: str | None = None) -> list[str]:
+    """Extract absolute `<a href>` links from a complete HTML body."""
+    extractor = LinkExtractor(base_url, encoding)
+    return extractor.feed_bytes(body) + extractor.finish()
+
+
+def extract_links_and_assets(body: bytes, base_url: str, encoding: str | None = None) -> tuple[list[str], list[str]]:
+    """Extract absolute `<a href>` links and `img`/`script`/`link` asset URLs from a complete HTML body."""
+    extractor = LinkExtractor(base_url, encoding, assets=True)
+    links = extractor.feed_bytes(body) + extractor.finish()
+    return links, extractor.assets
+
+
+def _extract_batch(items: list[tuple[bytes, str, str | None, bool]]) -> list[tuple[list[str], list[str]] | Exception]:
+    """Process pool entry point: extract (links, assets) for a batch of (body, url, encoding, assets) items."""
+    results = []
+    for body, base_url, encoding, assets in items:
+        try:
+            if assets:
+                results.append(extract_links_and_assets(body, base_url, encoding))
+            else:
+                results.append((extract_links(body, base_url, encoding), []))
+        except Exception as e:  # pylint: disable=broad-except
+            results.append(e)
+    return results
+
+
+class ParsePool:
+    """
+    Runs link extraction in a process pool so parsing never blocks the event loop.
+
+    Small bodies are grouped into batches (up to `batch_bytes`, or whatever has
+    arrived within `batch_delay` seconds) to amortize the IPC cost per page.
+    """
+
+    def __init__(self, workers: int, batch_bytes: int = 256 * 1024, batch_delay: float = 0.005):
+        self.workers = workers
+        self.batch_bytes = batch_bytes
+        self.batch_delay = batch_delay
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._batch = []
+        self._batch_size = 0
+        self._flush_handle = None
+
+    async def extract(self, body: bytes, base_url: str, encoding: str | None = None,
+                      assets: bool = False) -> tuple[list[str], list[str]]:
+        """Extract absolute (links, assets) from a complete HTML body in a worker process."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch.append(((body, base_url, encoding, assets), future))
+        self._batch_size += len(body)
+        if self._batch_size >= self.batch_bytes:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._batch:
+            return
+        batch, self._batch, self._batch_size = self._batch, [], 0
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(self._executor, _extract_batch, [item for item, _ in batch])
+        pending.add_done_callback(lambda done: self._distribute(batch, done))
+
+    @staticmethod
+    def _distribute(batch, done):
+        try:
+            results = done.result()
+        except BaseException as e:
+            # Fail every waiter (cancellation included) so none hangs, then surface the error
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
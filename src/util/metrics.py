@@ -0,0 +1,218 @@
+"""Crawl instrumentation: latency histograms, counters and periodic export."""
+import asyncio
+import bisect
+import json
+import os
+import time
+from pathlib import Path
+
+from util.logging import logger
+
+METRICS_FORMATS = ("json", "prometheus")
+DEFAULT_METRICS_INTERVAL = 5.0
+
+# Upper bounds in seconds, roughly log-spaced like the Prometheus client defaults
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# httpcore trace events that open and close each timed phase of a request
+TRACE_PHASES = {
+    "connection.connect_tcp.started": ("connect", True),
+    "connection.connect_tcp.complete": ("connect", False),
+    "connection.start_tls.started": ("tls", True),
+    "connection.start_tls.complete": ("tls", False),
+    "send_request_headers.started": ("ttfb", True),
+    "receive_response_headers.complete": ("ttfb", False),
+}
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 6) if value is not None else None
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and bucket-interpolated quantiles."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """Record one observation."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the q-quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        """Return a JSON-friendly view of the histogram."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            **{f"p{round(q * 100)}": _round(self.quantile(q)) for q in (0.5, 0.9, 0.99)},
+        }
+
+
+class CrawlMetrics:
+    """
+    Counters and latency histograms for one crawl.
+
+    Request phases come from httpx's `trace` extension: `connect` covers DNS
+    resolution plus the TCP handshake (httpcore doesn't report them apart),
+    `tls` the handshake, and `ttfb` the time from sending the request headers
+    to receiving the response headers. `wait` is time spent queued for a
+    politeness slot, and `dns` is only filled in when a resolver reports
+    lookups through `observe`.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.histograms = {name: Histogram() for name in ("wait", "dns", "connect", "tls", "ttfb", "request", "parse")}
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.hosts = {}  # host -> [requests, errors]
+        self.gauges = {}
+
+    def observe(self, name: str, value: float):
+        """Record a duration in the named histogram."""
+        self.histograms[name].observe(value)
+
+    def tracer(self):
+        """Return an httpx trace callback that times the phases of one request."""
+        opened = {}
+
+        async def trace(event_name: str, info: dict):
+            for suffix, (phase, start) in TRACE_PHASES.items():
+                if event_name.endswith(suffix):
+                    if start:
+                        opened[phase] = time.monotonic()
+                    elif phase in opened:
+                        self.observe(phase, time.monotonic() - opened.pop(phase))
+                    return
+
+        return trace
+
+    def record(self, host: str, ok: bool, size: int, elapsed: float | None, parse_time: float = 0.0):
+        """Record the outcome of one request."""
+        self.requests += 1
+        self.bytes += size
+        counts = self.hosts.setdefault(host, [0, 0])
+        counts[0] += 1
+        if not ok:
+            self.errors += 1
+            counts[1] += 1
+        if elapsed is not None:
+            self.observe("request", elapsed)
+        if parse_time:
+            self.observe("parse", parse_time)
+
+    def set_gauge(self, name: str, value: float):
+        """Set a point-in-time value such as frontier depth."""
+        self.gauges[name] = value
+
+    def snapshot(self) -> dict:
+        """Return every metric as a JSON-friendly dict."""
+        elapsed = time.monotonic() - self.started
+        return {
+            "timestamp": time.time(),
+            "elapsed": round(elapsed, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "requests_per_second": round(self.requests / elapsed, 3) if elapsed else 0.0,
+            "gauges": dict(self.gauges),
+            "latency": {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            "hosts": {
+                host: {"requests": requests, "errors": errors, "error_rate": round(errors / requests, 4)}
+                for host, (requests, errors) in self.hosts.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE util_scrape_requests_total counter",
+            f"util_scrape_requests_total {self.requests}",
+            "# TYPE util_scrape_errors_total counter",
+            f"util_scrape_errors_total {self.errors}",
+            "# TYPE util_scrape_bytes_total counter",
+            f"util_scrape_bytes_total {self.bytes}",
+        ]
+        for name, value in self.gauges.items():
+            lines += [f"# TYPE util_scrape_{name} gauge", f"util_scrape_{name} {value}"]
+        lines.append("# TYPE util_scrape_phase_seconds histogram")
+        for phase, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                lines.append(f'util_scrape_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'util_scrape_phase_seconds_sum{{phase="{phase}"}} {histogram.sum}')
+            lines.append(f'util_scrape_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+        lines.append("# TYPE util_scrape_host_requests_total counter")
+        for host, (requests, errors) in self.hosts.items():
+            lines.append(f'util_scrape_host_requests_total{{host="{host}"}} {requests}')
+            lines.append(f'util_scrape_host_errors_total{{host="{host}"}} {errors}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str | Path, fmt: str = "json"):
+        """Atomically write a snapshot to a file."""
+        path = Path(path)
+        content = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.snapshot(), indent=2)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def live_summary(self) -> str:
+        """One-line summary for the progress display."""
+        ttfb = self.histograms["ttfb"].quantile(0.5)
+        parse = self.histograms["parse"].quantile(0.5)
+        elapsed = time.monotonic() - self.started
+        parts = [
+            f"queued {self.gauges.get('frontier_depth', 0)}",
+            f"in flight {self.gauges.get('in_flight', 0)}",
+            f"{self.requests / elapsed if elapsed else 0:.1f} req/s",
+            f"ttfb p50 {ttfb * 1000:.0f}ms" if ttfb is not None else "ttfb p50 -",
+            f"parse p50 {parse * 1000:.1f}ms" if parse is not None else "parse p50 -",
+            f"{self.bytes / 1_048_576:.1f} MiB",
+            f"errors {self.errors}",
+        ]
+        return " · ".join(parts)
+
+    async def run(self, update, path: str | Path | None = None, fmt: str = "json",
+                  interval: float = DEFAULT_METRICS_INTERVAL):
+        """
+        Refresh gauges and the live summary every second until cancelled.
+
+        `update` is called with this object to refresh the gauges; a snapshot is
+        exported to `path` every `interval` seconds, and once more on cancellation.
+        """
+        last_export = time.monotonic()
+        try:
+            while True:
+                await asyncio.sleep(1.0)
+                update(self)
+                if path is not None and time.monotonic() - last_export >= interval:
+                    await asyncio.to_thread(self.export, path, fmt)
+                    last_export = time.monotonic()
+        finally:
+            if path is not None:
+                update(self)
+                self.export(path, fmt)
+                logger.debug(f"Exported crawl metrics to {path}")
@@ -0,0 +1,164 @@
+"""Per-host politeness limits for crawlers."""
+import asyncio
+import collections
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from util.logging import logger
+
+
+class TokenBucket:
+    """Async token bucket allowing `rate` acquisitions per second."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available, 0 if one is available now."""
+        self._refill()
+        wait = max(0.0, 1 - self.tokens) / self.rate
+        if self._lock.locked():
+            # Someone is already waiting in `acquire` and gets the next token first
+            wait += 1 / self.rate
+        return wait
+
+    async def acquire(self):
+        """Wait until a token is available and consume it."""
+        # The lock keeps waiters in FIFO order instead of racing on refill
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+@dataclass
+class HostLimits:
+    """Concurrency and request-rate limits for a single host."""
+    concurrency: int | None = None  # None means no per-host cap
+    rps: float = 0.0  # 0 means unlimited
+
+
+class PolitenessScheduler:
+    """
+    Hands out per-host request slots honoring concurrency caps and rate limits.
+
+    `defer` lets callers set aside a URL whose host is saturated instead of
+    waiting in `slot`, so one slow or throttled host doesn't hold up the rest.
+    """
+
+    def __init__(self, default: HostLimits | None = None, overrides: dict[str, HostLimits] | None = None):
+        self.default = default or HostLimits()
+        self.overrides = overrides or {}
+        self._semaphores = {}
+        self._buckets = {}
+        self._parked = {}  # host -> callbacks waiting for one of its slots to free up
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Return the host key (lowercase netloc) a URL is scheduled under."""
+        return urlsplit(url).netloc.lower()
+
+    def limits_for(self, host: str) -> HostLimits:
+        """Return the limits that apply to a host."""
+        return self.overrides.get(host, self.default)
+
+    def _state_for(self, host: str):
+        if host not in self._semaphores:
+            limits = self.limits_for(host)
+            self._semaphores[host] = asyncio.Semaphore(limits.concurrency) if limits.concurrency else None
+            self._buckets[host] = TokenBucket(limits.rps) if limits.rps > 0 else None
+        return self._semaphores[host], self._buckets[host]
+
+    def defer(self, url: str, callback) -> bool:
+        """
+        Return True if the URL's host can't start a request now, calling `callback` once it likely can.
+
+        A host at its concurrency cap calls back when one of its slots is
+        released (or `wake` finds one free), a rate-limited one when its next
+        token is due. The check is
+        a hint rather than a reservation: a URL it lets through may still
+        wait briefly in `slot` if another took the last slot first.
+        """
+        host = self.host_of(url)
+        semaphore, bucket = self._state_for(host)
+        if semaphore is not None and semaphore.locked():
+            self._parked.setdefault(host, collections.deque()).append(callback)
+            return True
+        wait = bucket.wait_time() if bucket is not None else 0.0
+        if wait > 0:
+            asyncio.get_running_loop().call_later(wait, callback)
+            return True
+        return False
+
+    def wake(self, url: str):
+        """Call back one URL deferred for this URL's host, if the host has a free slot."""
+        host = self.host_of(url)
+        parked = self._parked.get(host)
+        if not parked or self._semaphores[host].locked():
+            return
+        callback = parked.popleft()
+        if not parked:
+            del self._parked[host]
+        callback()
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold a request slot for the URL's host for the duration of the block."""
+        host = self.host_of(url)
+        semaphore, bucket = self._state_for(host)
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if bucket is not None:
+                await bucket.acquire()
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+                self.wake(url)
+
+    @classmethod
+    def from_config(cls, section: dict, concurrency: int | None = None, rps: float | None = None):
+        """
+        Build a scheduler from a `[SCRAPE]` config section.
+
+        Recognised keys are `per_host_concurrency`, `per_host_rps` and a `hosts`
+        table mapping a host to its own `concurrency` / `rps` overrides:
+
+            [SCRAPE]
+            per_host_rps = 2.0
+
+            [SCRAPE.hosts."example.com"]
+            concurrency = 1
+            rps = 0.5
+
+        Explicit `concurrency` / `rps` arguments (from the command line) take
+        precedence over the section defaults but not over per-host entries.
+        """
+        default = HostLimits(
+            concurrency=concurrency if concurrency is not None else section.get("per_host_concurrency"),
+            rps=float(rps if rps is not None else section.get("per_host_rps", 0.0)),
+        )
+        overrides = {}
+        for host, values in section.get("hosts", {}).items():
+            if not isinstance(values, dict):
+                logger.warning(f"Ignoring malformed SCRAPE.hosts entry for {host}")
+                continue
+            overrides[host.lower()] = HostLimits(
+                concurrency=values.get("concurrency", default.concurrency),
+                rps=float(values.get("rps", default.rps)),
+            )
+        return cls(default, overrides)
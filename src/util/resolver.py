@@ -0,0 +1,289 @@
+"""Async DNS resolution with a TTL cache for crawls spanning many hosts."""
+import asyncio
+import ipaddress
+import socket
+import time
+from contextlib import contextmanager
+
+from util.logging import logger
+
+DEFAULT_DNS_TTL = 300.0
+DEFAULT_NEGATIVE_TTL = 60.0
+# Lookups running ahead of the fetchers at once
+DEFAULT_PREFETCH_CONCURRENCY = 16
+
+
+def _get_aiodns():
+    """Lazy import the optional aiodns package; None if it isn't installed."""
+    try:
+        import aiodns
+        return aiodns
+    except ImportError:
+        return None
+
+
+def _get_httpcore():
+    """Lazy import httpcore to improve startup time."""
+    import httpcore
+    return httpcore
+
+
+def _get_httpx():
+    """Lazy import httpx to improve startup time."""
+    import httpx
+    return httpx
+
+
+# httpcore exceptions and their httpx counterparts share names; subclasses come first
+_MAPPED_ERRORS = (
+    "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout", "TimeoutException",
+    "ConnectError", "ReadError", "WriteError", "NetworkError", "ProxyError",
+    "UnsupportedProtocol", "RemoteProtocolError", "LocalProtocolError", "ProtocolError",
+)
+
+
+@contextmanager
+def _httpx_errors():
+    """Re-raise httpcore exceptions as the httpx ones callers expect."""
+    try:
+        yield
+    except Exception as e:
+        httpx, httpcore = _get_httpx(), _get_httpcore()
+        for name in _MAPPED_ERRORS:
+            if isinstance(e, getattr(httpcore, name)):
+                raise getattr(httpx, name)(str(e)) from e
+        raise
+
+
+class ResolutionError(OSError):
+    """A host name could not be resolved (possibly a cached failure)."""
+
+
+class CachingResolver:
+    """
+    Shared async resolver that caches addresses and failures per host.
+
+    Lookups go through c-ares when the optional aiodns package is installed,
+    which needs no threads and reports record TTLs; otherwise through the
+    event loop's getaddrinfo (on the default executor) with `ttl` as the TTL.
+    Failures are cached for `negative_ttl`. Concurrent lookups for the same
+    host share one query, and `prefetch` resolves hosts in the background as
+    they enter the frontier so the lookup is done before the first connect.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_DNS_TTL, negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 prefetch_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY, metrics=None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.metrics = metrics
+        self._cache = {}  # host -> (expires, addresses or error)
+        self._pending = {}  # host -> Future of a running lookup
+        self._prefetching = set()
+        self._prefetch_tasks = set()
+        self._prefetch_slots = asyncio.Semaphore(prefetch_concurrency)
+        self._aiodns_module = _get_aiodns()
+        self._aiodns = None  # created on first use, inside the event loop
+        self.lookups = 0
+        self.hits = 0
+
+    @property
+    def backend(self) -> str:
+        """Name of the lookup implementation in use."""
+        return "c-ares" if self._aiodns_module is not None else "getaddrinfo"
+
+    async def _lookup(self, host: str, port: int) -> tuple[list[str], float]:
+        if self._aiodns_module is not None:
+            if self._aiodns is None:
+                self._aiodns = self._aiodns_module.DNSResolver()
+            result = await self._aiodns.getaddrinfo(host, port=port, type=socket.SOCK_STREAM)
+            addresses, ttls = [], []
+            for node in result.nodes:
+                address = node.addr[0]
+                addresses.append(address.decode() if isinstance(address, bytes) else address)
+                ttls.append(node.ttl)
+            return list(dict.fromkeys(addresses)), float(min(ttls)) if ttls else self.ttl
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return list(dict.fromkeys(info[4][0] for info in infos)), self.ttl
+
+    async def _resolve(self, host: str, port: int) -> list[str]:
+        started = time.monotonic()
+        self.lookups += 1
+        try:
+            addresses, ttl = await self._lookup(host, port)
+            if not addresses:
+                raise ResolutionError(f"No addresses for {host}")
+        except Exception as e:  # pylint: disable=broad-except
+            error = e if isinstance(e, ResolutionError) else ResolutionError(f"Cannot resolve {host}: {e}")
+            self._cache[host] = (time.monotonic() + self.negative_ttl, error)
+            raise error from e
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("dns", time.monotonic() - started)
+        self._cache[host] = (time.monotonic() + ttl, addresses)
+        return addresses
+
+    def cached(self, host: str) -> list[str] | ResolutionError | None:
+        """Return the fresh cache entry for a host, if any."""
+        entry = self._cache.get(host)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[host]
+            return None
+        return entry[1]
+
+    async def resolve(self, host: str, port: int = 80) -> list[str]:
+        """Return the addresses of a host, raising ResolutionError if it doesn't resolve."""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        entry = self.cached(host)
+        if entry is not None:
+            self.hits += 1
+            if isinstance(entry, ResolutionError):
+                raise ResolutionError(str(entry))
+            return entry
+        future = self._pending.get(host)
+        if future is None:
+            future = self._pending[host] = asyncio.ensure_future(self._resolve(host, port))
+            future.add_done_callback(lambda _: self._pending.pop(host, None))
+        else:
+            self.hits += 1
+        return await asyncio.shield(future)
+
+    def prefetch(self, host: str, port: int = 80):
+        """Start resolving a host in the background unless it is cached or already being resolved."""
+        if host in self._prefetching or host in self._pending or self.cached(host) is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._prefetching.add(host)
+        task = loop.create_task(self._prefetch(host, port))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def _prefetch(self, host: str, port: int):
+        try:
+            async with self._prefetch_slots:
+                await self.resolve(host, port)
+        except (ResolutionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._prefetching.discard(host)
+
+    def network_backend(self):
+        """Return an httpcore network backend that connects through this resolver."""
+        httpcore = _get_httpcore()
+        resolver = self
+
+        class ResolvingBackend(httpcore.AsyncNetworkBackend):
+            """Resolves through the shared cache, then connects to each address in turn."""
+
+            def __init__(self):
+                self._backend = httpcore.AnyIOBackend()
+
+            async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+                try:
+                    addresses = await resolver.resolve(host, port)
+                except ResolutionError as e:
+                    raise httpcore.ConnectError(str(e)) from e
+                for index, address in enumerate(addresses):
+                    try:
+                        return await self._backend.connect_tcp(
+                            address, port, timeout=timeout, local_address=local_address,
+                            socket_options=socket_options,
+                        )
+                    except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                        if index == len(addresses) - 1:
+                            raise
+                        logger.debug(f"Connecting to {host} via {address} failed ({e}), trying the next address")
+
+            async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+                return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+            async def sleep(self, seconds):
+                await self._backend.sleep(seconds)
+
+        return ResolvingBackend()
+
+    def transport(self, limits, http2: bool = False):
+        """
+        Return an httpx transport whose connections are opened through this resolver.
+
+        httpx has no option for the network backend, so this builds the httpcore
+        connection pool itself and adapts requests, responses and errors the way
+        `httpx.AsyncHTTPTransport` does.
+        """
+        httpx, httpcore = _get_httpx(), _get_httpcore()
+
+        class ResponseStream(httpx.AsyncByteStream):
+            def __init__(self, stream):
+                self._stream = stream
+
+            async def __aiter__(self):
+                with _httpx_errors():
+                    async for part in self._stream:
+                        yield part
+
+            async def aclose(self):
+                await self._stream.aclose()
+
+        class ResolvingTransport(httpx.AsyncBaseTransport):
+            """httpx transport over an httpcore pool using the resolver's network backend."""
+
+            def __init__(self, network_backend):
+                self._pool = httpcore.AsyncConnectionPool(
+                    ssl_context=httpx.create_ssl_context(),
+                    max_connections=limits.max_connections,
+                    max_keepalive_connections=limits.max_keepalive_connections,
+                    keepalive_expiry=limits.keepalive_expiry,
+                    http1=True,
+                    http2=http2,
+                    network_backend=network_backend,
+                )
+
+            async def handle_async_request(self, request):
+                core_request = httpcore.Request(
+                    method=request.method,
+                    url=httpcore.URL(
+                        scheme=request.url.raw_scheme,
+                        host=request.url.raw_host,
+                        port=request.url.port,
+                        target=request.url.raw_path,
+                    ),
+                    headers=request.headers.raw,
+                    content=request.stream,
+                    extensions=request.extensions,
+                )
+                with _httpx_errors():
+                    response = await self._pool.handle_async_request(core_request)
+                return httpx.Response(
+                    status_code=response.status,
+                    headers=response.headers,
+                    stream=ResponseStream(response.stream),
+                    extensions=response.extensions,
+                )
+
+            async def aclose(self):
+                await self._pool.aclose()
+
+        return ResolvingTransport(self.network_backend())
+
+    async def close(self):
+        """Stop background lookups and release the c-ares channel."""
+        for future in list(self._pending.values()):
+            future.cancel()
+        for task in list(self._prefetch_tasks):
+            task.cancel()
+        await asyncio.gather(*self._prefetch_tasks, return_exceptions=True)
+        if self._aiodns is not None:
+            close = getattr(self._aiodns, "close", None)
+            if close is not None:
+                await close()
+            else:
+                self._aiodns.cancel()
@@ -0,0 +1,111 @@
+"""Incremental result output for crawls."""
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+
+import aiofiles
+
+from util.logging import logger
+
+OUTPUT_FORMATS = ("jsonl", "csv")
+RESULT_FIELDS = ("url", "source", "depth", "status", "ok", "latency", "bytes", "error")
+
+# Records written per batch; bounds the work done between event loop yields
+BATCH_SIZE = 500
+
+
+class ResultWriter:
+    """
+    Streams per-URL crawl records to a JSONL or CSV file from a background task.
+
+    Records are handed over through a bounded queue and dropped from memory as
+    soon as they are written, so memory stays flat however large the crawl is.
+    """
+
+    def __init__(self, path: str = "-", fmt: str = "jsonl", append: bool = False, max_pending: int = 10000):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.append = append
+        self.written = 0
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self.error = None  # what stopped `run`, if it failed
+
+    @property
+    def to_stdout(self) -> bool:
+        """Whether records go to standard output."""
+        return self.path == "-"
+
+    async def write(self, record: dict):
+        """
+        Queue a record for writing, waiting if the writer has fallen behind.
+
+        Raises the writer's error once `run` has failed, rather than waiting on a queue nobody drains.
+        """
+        if self.error is not None:
+            raise self.error
+        await self._queue.put(record)
+
+    def _format(self, records: list[dict], header: bool) -> str:
+        if self.fmt == "jsonl":
+            return "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS, extrasaction="ignore", lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows(records)
+        return buffer.getvalue()
+
+    async def _drain(self) -> list[dict] | None:
+        record = await self._queue.get()
+        if record is None:
+            return None
+        records = [record]
+        while len(records) < BATCH_SIZE and not self._queue.empty():
+            record = self._queue.get_nowait()
+            if record is None:
+                # Put the sentinel back so the next drain ends the loop
+                self._queue.put_nowait(None)
+                break
+            records.append(record)
+        return records
+
+    async def run(self):
+        """Write queued records until `close` is called."""
+        try:
+            await self._write_all()
+        except Exception as e:
+            self.error = e
+            # Nothing will drain the queue any more; empty it so blocked `write` calls return
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            raise
+
+    async def _write_all(self):
+        if self.to_stdout:
+            header = True
+            while (records := await self._drain()) is not None:
+                sys.stdout.write(self._format(records, header))
+                sys.stdout.flush()
+                header = False
+                self.written += len(records)
+            return
+
+        mode = "a" if self.append else "w"
+        header = not (self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0)
+        async with aiofiles.open(self.path, mode, encoding="utf-8", newline="") as f:
+            while (records := await self._drain()) is not None:
+                await f.write(self._format(records, header))
+                await f.flush()
+                header = False
+                self.written += len(records)
+        logger.debug(f"Wrote {self.written} records to {self.path}")
+
+    async def close(self):
+        """Signal the writer task to finish once everything queued is written."""
+        if self.error is None:
+            await self._queue.put(None)
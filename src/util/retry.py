@@ -0,0 +1,154 @@
+"""Retry backoff and per-host circuit breaking for crawler fetches."""
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from util.logging import logger
+
+# Statuses worth retrying; everything else in 4xx is a real answer
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+# Longest a circuit stays open after repeated failed probes
+MAX_RESET_TIMEOUT = 10 * 60.0
+
+
+def status_of(error: BaseException) -> int | None:
+    """Return the HTTP status behind an error, if it carries a response."""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header (seconds or an HTTP date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host} after repeated failures, next probe in {retry_in:.0f}s")
+        self.host = host
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed fetch is retried.
+
+    Transport errors (any of `transport_errors`) and statuses in `RETRY_STATUSES`
+    are retried up to `retries` times with full-jitter exponential backoff. A
+    `Retry-After` header is honored as a lower bound; if it asks for longer than
+    `max_delay`, the fetch is given up instead.
+    """
+
+    def __init__(self, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 max_delay: float = DEFAULT_MAX_DELAY, transport_errors: tuple[type, ...] = ()):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.transport_errors = transport_errors
+
+    def retryable(self, error: BaseException) -> bool:
+        """Whether an error is worth another attempt."""
+        return isinstance(error, self.transport_errors) or status_of(error) in RETRY_STATUSES
+
+    def delay(self, error: BaseException, attempt: int) -> float | None:
+        """Seconds to wait before retry number `attempt + 1`, or None to give up."""
+        if attempt >= self.retries or not self.retryable(error):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.backoff * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = parse_retry_after(response.headers.get("retry-after") if response is not None else None)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                logger.debug(f"Retry-After of {retry_after:.0f}s exceeds {self.max_delay:.0f}s, giving up")
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    open_until: float | None = None
+    reset_timeout: float = DEFAULT_RESET_TIMEOUT
+    probing: bool = False
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `threshold` consecutive host failures (transport errors or 5xx) the
+    host's circuit opens and its URLs fail fast without a request. Once
+    `reset_timeout` has passed a single probe request is let through: success
+    closes the circuit, failure reopens it for twice as long.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 transport_errors: tuple[type, ...] = ()):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.transport_errors = transport_errors
+        self._circuits = {}
+        self.fast_failed = 0
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Return the host key a URL's circuit is tracked under."""
+        return urlsplit(url).netloc.lower()
+
+    def is_host_failure(self, error: BaseException) -> bool:
+        """Whether an error says something about the host's health rather than the page."""
+        status = status_of(error)
+        return isinstance(error, self.transport_errors) or (status is not None and status >= 500)
+
+    def check(self, url: str):
+        """Raise CircuitOpenError unless a request to the URL's host may go ahead."""
+        host = self.host_of(url)
+        circuit = self._circuits.get(host)
+        if circuit is None or circuit.open_until is None:
+            return
+        now = time.monotonic()
+        if now < circuit.open_until or circuit.probing:
+            self.fast_failed += 1
+            raise CircuitOpenError(host, max(0.0, circuit.open_until - now))
+        circuit.probing = True
+        logger.debug(f"Probing {host} after its circuit was open")
+
+    def record(self, url: str, error: BaseException | None = None):
+        """Record the outcome of a request that `check` let through."""
+        host = self.host_of(url)
+        if error is None or not self.is_host_failure(error):
+            circuit = self._circuits.pop(host, None)
+            if circuit is not None and circuit.open_until is not None:
+                logger.debug(f"Circuit for {host} closed")
+            return
+        circuit = self._circuits.setdefault(host, _Circuit(reset_timeout=self.reset_timeout))
+        circuit.failures += 1
+        if circuit.probing:
+            circuit.reset_timeout = min(circuit.reset_timeout * 2, MAX_RESET_TIMEOUT)
+        elif circuit.failures < self.threshold or circuit.open_until is not None:
+            return
+        circuit.probing = False
+        circuit.open_until = time.monotonic() + circuit.reset_timeout
+        logger.warning(f"Circuit for {host} opened for {circuit.reset_timeout:.0f}s "
+                       f"after {circuit.failures} failures")
@@ -0,0 +1,184 @@
+"""robots.txt rules and sitemap discovery with an on-disk cache."""
+import asyncio
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from util.config import CACHE_DIR
+from util.logging import logger
+
+DEFAULT_ROBOTS_FILE = CACHE_DIR / "robots.sqlite"
+DEFAULT_ROBOTS_TTL = 24 * 60 * 60
+DEFAULT_SITEMAP_MAX_URLS = 100_000
+# Nested sitemaps followed per host, to bound runaway sitemap indexes
+MAX_SITEMAPS = 1000
+ROBOTS_AGENT = "util"
+
+
+def origin_of(url: str) -> str:
+    """Return the scheme://host[:port] origin of a URL."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _build_parser(status: int, body: str) -> RobotFileParser:
+    # Mirror RobotFileParser.read: auth errors disallow everything, other errors allow everything
+    parser = RobotFileParser()
+    if status in (401, 403):
+        parser.disallow_all = True
+    elif status >= 400:
+        parser.allow_all = True
+    else:
+        parser.parse(body.splitlines())
+    return parser
+
+
+async def iter_sitemap(url: str, client):
+    """
+    Stream-parse a sitemap or sitemap index, yielding ("page" | "sitemap", url) pairs.
+
+    The body is fed to an incremental XML parser chunk by chunk, gunzipping on
+    the fly when the file itself is gzipped, and parsed elements are discarded
+    as soon as they are yielded so memory stays flat for large sitemaps.
+    """
+    async with client.stream("GET", url, timeout=30.0) as response:
+        response.raise_for_status()
+        parser = ET.XMLPullParser(events=("start", "end"))
+        decompressor = None
+        root = None
+        loc = None
+        first = True
+        async for chunk in response.aiter_bytes():
+            if first:
+                first = False
+                if chunk[:2] == b"\x1f\x8b":
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            parser.feed(decompressor.decompress(chunk) if decompressor else chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    root = element if root is None else root
+                    continue
+                tag = element.tag.rsplit("}", 1)[-1]
+                if tag == "loc":
+                    loc = (element.text or "").strip()
+                elif tag in ("url", "sitemap"):
+                    if loc:
+                        yield ("page" if tag == "url" else "sitemap"), loc
+                    loc = None
+                    root.clear()
+
+
+class RobotsCache:
+    """
+    Per-crawl robots.txt and sitemap lookups backed by a SQLite cache with a TTL.
+
+    robots.txt is fetched at most once per host per crawl (and not at all while
+    the cached copy is fresh). Sitemap page lists are cached the same way.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_ROBOTS_FILE, ttl: float = DEFAULT_ROBOTS_TTL,
+                 max_sitemap_urls: int = DEFAULT_SITEMAP_MAX_URLS):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_sitemap_urls = max_sitemap_urls
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS robots (origin TEXT PRIMARY KEY, status INTEGER, body TEXT, fetched REAL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS sitemaps (origin TEXT PRIMARY KEY, fetched REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sitemap_urls (origin TEXT, url TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sitemap_urls_origin ON sitemap_urls (origin)")
+        self._db.commit()
+        self._parsers = {}  # origin -> RobotFileParser, or a Future while being fetched
+
+    def _fresh(self, fetched: float) -> bool:
+        return time.time() - fetched < self.ttl
+
+    async def _load(self, origin: str, client) -> RobotFileParser:
+        row = self._db.execute("SELECT status, body, fetched FROM robots WHERE origin = ?", (origin,)).fetchone()
+        if row is not None and self._fresh(row[2]):
+            return _build_parser(row[0], row[1])
+        try:
+            response = await client.get(f"{origin}/robots.txt", timeout=30.0)
+            status, body = response.status_code, response.text if response.status_code < 400 else ""
+        except Exception as e:  # pylint: disable=broad-except
+            # An unreachable robots.txt shouldn't block the crawl; treat it as missing
+            logger.debug(f"Could not fetch robots.txt for {origin}: {e}")
+            status, body = 404, ""
+        self._db.execute(
+            "INSERT OR REPLACE INTO robots (origin, status, body, fetched) VALUES (?, ?, ?, ?)",
+            (origin, status, body, time.time()),
+        )
+        self._db.commit()
+        return _build_parser(status, body)
+
+    async def parser_for(self, url: str, client) -> RobotFileParser:
+        """Return the robots.txt rules for a URL's host, fetching them once if needed."""
+        origin = origin_of(url)
+        parser = self._parsers.get(origin)
+        if parser is None:
+            # Concurrent callers for the same host share one fetch
+            parser = self._parsers[origin] = asyncio.ensure_future(self._load(origin, client))
+        if isinstance(parser, asyncio.Future):
+            try:
+                result = await parser
+            except BaseException:
+                self._parsers.pop(origin, None)
+                raise
+            self._parsers[origin] = result
+            return result
+        return parser
+
+    async def allowed(self, url: str, client) -> bool:
+        """Whether robots.txt lets us fetch a URL."""
+        parser = await self.parser_for(url, client)
+        return parser.can_fetch(ROBOTS_AGENT, url)
+
+    async def sitemap_pages(self, url: str, client):
+        """Yield the page URLs listed in the sitemaps of a URL's host."""
+        origin = origin_of(url)
+        row = self._db.execute("SELECT fetched FROM sitemaps WHERE origin = ?", (origin,)).fetchone()
+        if row is not None and self._fresh(row[0]):
+            for (page,) in self._db.execute("SELECT url FROM sitemap_urls WHERE origin = ?", (origin,)):
+                yield page
+            return
+
+        parser = await self.parser_for(url, client)
+        pending = list(parser.site_maps() or [urljoin(origin, "/sitemap.xml")])
+        visited = set()
+        pages = []
+        while pending and len(visited) < MAX_SITEMAPS and len(pages) < self.max_sitemap_urls:
+            sitemap = pending.pop()
+            if sitemap in visited:
+                continue
+            visited.add(sitemap)
+            try:
+                async for kind, loc in iter_sitemap(sitemap, client):
+                    if kind == "sitemap":
+                        pending.append(loc)
+                        continue
+                    pages.append(loc)
+                    yield loc
+                    if len(pages) >= self.max_sitemap_urls:
+                        break
+            except Exception as e:  # pylint: disable=broad-except
+                logger.debug(f"Skipping sitemap {sitemap}: {e}")
+        logger.debug(f"Read {len(pages)} URLs from {len(visited)} sitemaps for {origin}")
+
+        with self._db:
+            self._db.execute("DELETE FROM sitemap_urls WHERE origin = ?", (origin,))
+            self._db.executemany(
+                "INSERT INTO sitemap_urls (origin, url) VALUES (?, ?)", ((origin, page) for page in pages)
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sitemaps (origin, fetched) VALUES (?, ?)", (origin, time.time())
+            )
+
+    def close(self):
+        """Close the cache database."""
+        self._db.close()
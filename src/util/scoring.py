@@ -0,0 +1,54 @@
+"""Scores that decide which crawl frontier entries are fetched first."""
+import re
+from urllib.parse import urlsplit
+
+# Frontier orders; "fifo" is plain breadth-first in discovery order
+PRIORITIES = ("fifo", "depth", "same-domain")
+
+# Added to the score of URLs on other hosts under "same-domain"
+OFF_DOMAIN_PENALTY = 100.0
+
+
+def parse_boosts(values) -> list[tuple[re.Pattern, float]]:
+    """
+    Parse "REGEX=WEIGHT" strings into compiled patterns and weights.
+
+    Raises:
+        ValueError: If a value has no weight or its pattern doesn't compile.
+    """
+    boosts = []
+    for value in values:
+        pattern, sep, weight = value.rpartition("=")
+        if not sep or not pattern:
+            raise ValueError(f"Expected REGEX=WEIGHT, got {value!r}")
+        try:
+            boosts.append((re.compile(pattern), float(weight)))
+        except (re.error, ValueError) as e:
+            raise ValueError(f"Invalid boost {value!r}: {e}") from e
+    return boosts
+
+
+class FrontierScore:
+    """
+    Scores frontier entries; lower scores are fetched first.
+
+    The score is the entry's depth, plus `OFF_DOMAIN_PENALTY` for hosts other
+    than `home` when `same_domain` is set, minus the weight of every boost
+    pattern the URL matches, so a boost of 2 lets a page jump two levels ahead.
+    """
+
+    def __init__(self, home: str | None = None, same_domain: bool = False,
+                 boosts: list[tuple[re.Pattern, float]] = ()):
+        self.home = home
+        self.same_domain = same_domain and home is not None
+        self.boosts = list(boosts)
+
+    def __call__(self, item) -> float:
+        url, depth = item[0], item[1]
+        score = float(depth)
+        if self.same_domain and urlsplit(url).netloc != self.home:
+            score += OFF_DOMAIN_PENALTY
+        for pattern, weight in self.boosts:
+            if pattern.search(url):
+                score -= weight
+        return score
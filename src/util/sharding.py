@@ -0,0 +1,184 @@
+"""Host-partitioned sharding for crawls spread over processes or machines."""
+import asyncio
+import json
+import os
+import zlib
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from util.logging import logger
+
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+def shard_for(url: str, shards: int) -> int:
+    """Return the shard that owns a URL, by a stable hash of its host."""
+    host = urlsplit(url).netloc.lower()
+    return zlib.crc32(host.encode("utf-8")) % shards
+
+
+def _write_json(path: Path, data: dict):
+    # Write then rename so readers on other processes/hosts never see a partial file
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ShardRouter:
+    """
+    Routes frontier entries between crawl shards through a shared directory.
+
+    Every URL is owned by exactly one shard (by host hash). Entries for other
+    shards are appended to a per-(sender, receiver) mailbox file that only the
+    sender ever writes, so the directory can live on a filesystem shared by
+    several machines without any locking. Each shard publishes a status file
+    with its idle flag and sent/received counts; the crawl is over once every
+    shard is idle and the totals balance across two consecutive polls.
+    """
+
+    def __init__(self, directory: str | Path, shards: int, index: int,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        if not 0 <= index < shards:
+            raise ValueError(f"Shard index {index} out of range for {shards} shards")
+        self.directory = Path(directory)
+        self.shards = shards
+        self.index = index
+        self.poll_interval = poll_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sent = 0
+        self.received = 0
+        self._outgoing = {}  # shard -> list of encoded lines
+        self._offsets = {}  # sending shard -> bytes consumed from its mailbox
+        self._last_snapshot = None
+        for path in (self.status_path(index), self.summary_path(index),
+                     *(self._mailbox(index, other) for other in range(shards))):
+            path.unlink(missing_ok=True)
+
+    def status_path(self, index: int) -> Path:
+        """Path of a shard's status file."""
+        return self.directory / f"shard-{index}.status.json"
+
+    def summary_path(self, index: int) -> Path:
+        """Path of a shard's final summary file."""
+        return summary_path(self.directory, index)
+
+    def _mailbox(self, sender: int, receiver: int) -> Path:
+        return self.directory / f"mail-{sender}-to-{receiver}.jsonl"
+
+    def owns(self, url: str) -> bool:
+        """Whether this shard is responsible for fetching a URL."""
+        return shard_for(url, self.shards) == self.index
+
+    def forward(self, item: tuple, key: str | None = None):
+        """
+        Queue a frontier entry for the shard that owns its URL.
+
+        `key` is the URL's canonical form when the entry holds it as discovered;
+        ownership must be decided on the same form `owns` is asked about.
+        """
+        owner = shard_for(key or item[0], self.shards)
+        self._outgoing.setdefault(owner, []).append(json.dumps(list(item)) + "\n")
+
+    def _flush(self, outgoing: dict[int, list[str]]):
+        for owner, lines in outgoing.items():
+            with open(self._mailbox(self.index, owner), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def _read_inbox(self) -> list[list]:
+        items = []
+        for sender in range(self.shards):
+            if sender == self.index:
+                continue
+            path = self._mailbox(sender, self.index)
+            offset = self._offsets.get(sender, 0)
+            try:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            # Only consume complete lines; a partial trailing line is picked up next poll
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                items.append(json.loads(line))
+            self._offsets[sender] = offset + end
+        return items
+
+    def _all_done(self) -> bool:
+        statuses = [_read_json(self.status_path(i)) for i in range(self.shards)]
+        if any(status is None or not status["idle"] for status in statuses):
+            self._last_snapshot = None
+            return False
+        snapshot = [(status["sent"], status["received"]) for status in statuses]
+        balanced = sum(sent for sent, _ in snapshot) == sum(received for _, received in snapshot)
+        # Counters must be balanced and unchanged since the last poll to rule out in-transit entries
+        done = balanced and snapshot == self._last_snapshot
+        self._last_snapshot = snapshot
+        return done
+
+    async def run(self, scraper):
+        """Exchange entries with the other shards until the whole crawl is finished."""
+        while True:
+            outgoing, self._outgoing = self._outgoing, {}
+            if outgoing:
+                await asyncio.to_thread(self._flush, outgoing)
+                self.sent += sum(len(lines) for lines in outgoing.values())
+
+            items = await asyncio.to_thread(self._read_inbox)
+            self.received += len(items)
+            for item in items:
+                scraper.enqueue(*item)
+
+            idle = not items and not self._outgoing and scraper.idle
+            await asyncio.to_thread(_write_json, self.status_path(self.index), {
+                "idle": idle, "sent": self.sent, "received": self.received,
+            })
+            if idle and await asyncio.to_thread(self._all_done):
+                logger.debug(f"Shard {self.index}: all {self.shards} shards idle, finishing")
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    def write_summary(self, summary: dict):
+        """Publish this shard's final counts for merging."""
+        _write_json(self.summary_path(self.index), summary)
+
+    async def merged_summary(self, timeout: float = 60.0) -> dict | None:
+        """Wait for every shard's summary and add them up; None if some never arrive."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            summaries = read_summaries(self.directory, self.shards)
+            if all(summary is not None for summary in summaries):
+                return merge_summaries(summaries)
+            if loop.time() > deadline:
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+
+def summary_path(directory: str | Path, index: int) -> Path:
+    """Path of a shard's final summary file inside the shard directory."""
+    return Path(directory) / f"shard-{index}.summary.json"
+
+
+def read_summaries(directory: str | Path, shards: int) -> list[dict | None]:
+    """Read every shard's summary; shards that haven't finished yield None."""
+    return [_read_json(summary_path(directory, index)) for index in range(shards)]
+
+
+def merge_summaries(summaries: list[dict]) -> dict:
+    """Add up per-shard summaries into one."""
+    merged = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
@@ -0,0 +1,69 @@
+"""Live rendering of Markdown responses that arrive as a stream of text chunks."""
+# How often the part of the reply still being written is re-rendered
+REFRESH_PER_SECOND = 10
+
+_FENCES = ("```", "~~~")
+
+
+def _get_live():
+    """Lazy import Live to improve startup time."""
+    from rich.live import Live
+    return Live
+
+
+def _get_markdown():
+    """Lazy import Markdown to improve startup time."""
+    from rich.markdown import Markdown
+    return Markdown
+
+
+def stable_prefix(text: str) -> int:
+    """
+    Return how much of a partial Markdown text is made of finished blocks.
+
+    A block is finished once a blank line or a closing code fence follows it,
+    so the prefix up to there renders the same however the text goes on.
+    `text` must start outside a code fence.
+    """
+    in_fence = False
+    offset = 0
+    end = 0
+    for line in text.splitlines(keepends=True):
+        offset += len(line)
+        if not line.endswith("\n"):
+            break
+        stripped = line.strip()
+        if stripped.startswith(_FENCES):
+            in_fence = not in_fence
+            if not in_fence:
+                end = offset
+        elif not in_fence and not stripped:
+            end = offset
+    return end
+
+
+async def render_markdown_stream(console, chunks, refresh_per_second: float = REFRESH_PER_SECOND) -> str:
+    """
+    Render text chunks as Markdown while they stream in and return the whole text.
+
+    Finished blocks are printed once, above a rich `Live` view, so only the
+    block still being written is re-parsed, and only at `refresh_per_second`
+    rather than on every chunk. Re-rendering the whole reply per token would
+    make long answers quadratic.
+    """
+    Live = _get_live()
+    Markdown = _get_markdown()
+    parts = []
+    pending = ""  # text after the last finished block
+
+    with Live(get_renderable=lambda: Markdown(pending), console=console,
+              refresh_per_second=refresh_per_second, vertical_overflow="visible") as live:
+        async for chunk in chunks:
+            parts.append(chunk)
+            pending += chunk
+            finished = stable_prefix(pending)
+            if finished:
+                live.console.print(Markdown(pending[:finished]))
+                pending = pending[finished:]
+        live.refresh()
+    return "".join(parts)
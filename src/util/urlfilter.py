@@ -0,0 +1,92 @@
+"""Include/exclude filters deciding which discovered URLs are crawled."""
+import re
+
+# Patterns with this prefix are regular expressions, anything else is a glob
+REGEX_PREFIX = "re:"
+
+
+def url_target(url: str) -> str:
+    """Return the path and query of an absolute URL ("/a/b?c=1"), the part filters match against."""
+    start = url.find("/", url.find("//") + 2)
+    if start < 0:
+        return "/"
+    end = url.find("#", start)
+    return url[start:end] if end >= 0 else url[start:]
+
+
+def _compile_regex(source: str):
+    try:
+        return re.compile(source)
+    except re.error as e:
+        raise ValueError(f"Invalid regex {source!r}: {e}") from e
+
+
+def _glob_source(pattern: str) -> str:
+    return ".*".join(re.escape(part) for part in pattern.split("*")) + r"\Z"
+
+
+class _Rules:
+    """
+    Globs compiled into one alternation, with an optional prefix pre-check, plus separate regexes.
+
+    Regexes are kept apart because inline flags, group numbers and
+    backreferences stop meaning the same thing once patterns are joined.
+    """
+
+    def __init__(self, patterns: list[str]):
+        globs = [pattern for pattern in patterns if not pattern.startswith(REGEX_PREFIX)]
+        self.regexes = [_compile_regex(pattern[len(REGEX_PREFIX):]) for pattern in patterns
+                        if pattern.startswith(REGEX_PREFIX)]
+        self.globs = re.compile("|".join(f"(?:{_glob_source(glob)})" for glob in globs), re.DOTALL) if globs else None
+        prefixes = [glob.split("*", 1)[0] for glob in globs]
+        # Only usable when every pattern is a glob anchored on a literal path prefix
+        usable = not self.regexes and all(prefix.startswith("/") for prefix in prefixes)
+        self.prefixes = tuple(prefixes) if usable else None
+
+    def match(self, target: str) -> bool:
+        if self.prefixes is not None and not target.startswith(self.prefixes):
+            return False
+        if self.globs is not None and self.globs.match(target):
+            return True
+        # Regexes are searched anywhere in the target
+        return any(regex.search(target) for regex in self.regexes)
+
+
+class UrlFilter:
+    """
+    Decides whether a URL passes `--include` / `--exclude` rules.
+
+    Rules match the URL's path and query as discovered, before canonicalization,
+    so rules on query parameters work whatever the query policy. A rule is a glob where `*` matches
+    any run of characters (so "/blog/*" covers everything under /blog/), or a
+    regular expression searched anywhere in the path and query when written as
+    "re:<regex>". A URL passes if it matches any include rule (or there are
+    none) and no exclude rule. Each side's globs are compiled into a single
+    regex, and when all of its rules are globs with a literal prefix, a
+    `str.startswith` check rules out most URLs before the regex runs. Regexes
+    are matched one by one, so their flags and backreferences work as written.
+    """
+
+    def __init__(self, include: list[str] = (), exclude: list[str] = ()):
+        self.include = _Rules(list(include)) if include else None
+        self.exclude = _Rules(list(exclude)) if exclude else None
+        self.patterns = (list(include), list(exclude))
+
+    def __bool__(self) -> bool:
+        return self.include is not None or self.exclude is not None
+
+    def __call__(self, url: str) -> bool:
+        target = url_target(url)
+        if self.include is not None and not self.include.match(target):
+            return False
+        return self.exclude is None or not self.exclude.match(target)
+
+    def describe(self) -> str:
+        """Short description for the crawl banner."""
+        include, exclude = self.patterns
+        parts = []
+        if include:
+            parts.append(f"include {', '.join(include)}")
+        if exclude:
+            parts.append(f"exclude {', '.join(exclude)}")
+        return "; ".join(parts) or "none"
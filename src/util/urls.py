@@ -0,0 +1,61 @@
+"""URL canonicalization helpers."""
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# How the query string is treated when building the canonical form
+QUERY_POLICIES = ("keep", "sort", "drop")
+
+
+def canonicalize_url(url: str, query_policy: str = "keep") -> str | None:
+    """
+    Return the canonical form of an absolute http(s) URL.
+
+    The scheme and host are lowercased, default ports are dropped, the
+    fragment is removed and a trailing slash on a non-root path is stripped,
+    so that `/a`, `/a/`, `/a#top` and `HTTP://Host/a` all map to the same key.
+
+    Args:
+        url (str): The absolute URL to canonicalize.
+        query_policy (str): "keep" leaves the query untouched, "sort" orders
+                            the parameters by name and "drop" removes it.
+
+    Returns:
+        str: The canonical URL, or None if the URL is not http(s).
+    """
+    if query_policy not in QUERY_POLICIES:
+        raise ValueError(f"Unknown query policy: {query_policy}")
+
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    netloc = parts.hostname.lower()
+    if ":" in netloc:
+        # IPv6 literal
+        netloc = f"[{netloc}]"
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    if parts.username or parts.password:
+        userinfo = parts.username or ""
+        if parts.password:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = parts.query
+    if query_policy == "drop":
+        query = ""
+    elif query_policy == "sort" and query:
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
@@ -0,0 +1,238 @@
+"""WARC archiving of crawled pages, and reading archives back."""
+import asyncio
+import base64
+import gzip
+import hashlib
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from util.logging import logger
+
+DEFAULT_WARC_MAX_BYTES = 1024 ** 3
+WARC_VERSION = b"WARC/1.1"
+
+# Exchanges written per batch from the writer thread
+BATCH_SIZE = 50
+
+# Hop-by-hop and encoding headers that no longer describe the stored (decoded) payload
+_STALE_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+
+def split_warc_path(path: str | Path) -> tuple[str, str]:
+    """Split "crawl.warc.gz" into ("crawl", ".warc.gz") so part numbers go between the two."""
+    name = str(path)
+    for suffix in (".warc.gz", ".warc"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)], suffix
+    return name, ".warc.gz" if name.endswith(".gz") else ".warc"
+
+
+def _warc_date() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _digest(data) -> str:
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode("ascii")
+
+
+def _record(warc_type: str, headers: dict, block: list) -> list:
+    """Return the parts of one WARC record; `block` is a list of bytes-like parts."""
+    length = sum(len(part) for part in block)
+    lines = [WARC_VERSION, f"WARC-Type: {warc_type}".encode()]
+    lines += [f"{name}: {value}".encode("utf-8") for name, value in headers.items()]
+    lines.append(f"Content-Length: {length}".encode())
+    return [b"\r\n".join(lines) + b"\r\n\r\n", *block, b"\r\n\r\n"]
+
+
+class WarcWriter:
+    """
+    Streams request/response records of fetched pages to rotating WARC files.
+
+    Pages are handed over through a bounded queue and written from a background
+    task, which digests, compresses and writes them on a worker thread. Each
+    record is its own gzip member, so archives can be read from any record
+    offset. A new file (`<base>-00001.warc.gz`, ...) is started once the
+    current one passes `max_bytes`.
+
+    The stored payload is the decoded body the crawler read, so the
+    Content-Encoding and Transfer-Encoding headers are dropped and
+    Content-Length is set to match it. Bodies cut off at the crawler's size
+    limit are marked with `WARC-Truncated: length`.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = DEFAULT_WARC_MAX_BYTES, max_pending: int = 100):
+        self.base, self.suffix = split_warc_path(path)
+        self.compress = self.suffix.endswith(".gz")
+        self.max_bytes = max_bytes
+        self.files = []
+        self.written = 0
+        self._file = None
+        self._size = 0
+        self._queue = asyncio.Queue(maxsize=max_pending)
+        self.error = None  # what stopped `run`, if it failed
+
+    @property
+    def pattern(self) -> str:
+        """Glob matching every file this writer creates."""
+        return f"{self.base}-*{self.suffix}"
+
+    async def write(self, response, body, truncated: bool = False):
+        """
+        Queue a response and its body for archiving, waiting if the writer has fallen behind.
+
+        Raises the writer's error once `run` has failed, rather than waiting on a queue nobody drains.
+        """
+        if self.error is not None:
+            raise self.error
+        await self._queue.put((response, body, truncated))
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        path = Path(f"{self.base}-{len(self.files):05d}{self.suffix}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "wb")
+        self._size = 0
+        self.files.append(path)
+        info = (f"software: util-cli\r\nformat: WARC File Format 1.1\r\n"
+                f"conformsTo: http://iipc.github.io/warc-specifications/specifications/warc-format/warc-1.1/\r\n")
+        self._emit(_record("warcinfo", {
+            "WARC-Date": _warc_date(),
+            "WARC-Filename": path.name,
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "Content-Type": "application/warc-fields",
+        }, [info.encode("utf-8")]))
+        logger.debug(f"Started WARC file {path}")
+
+    def _emit(self, parts: list):
+        if self.compress:
+            # One gzip member per record
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            parts = [compressor.compress(part) for part in parts] + [compressor.flush()]
+        for part in parts:
+            self._file.write(part)
+            self._size += len(part)
+
+    def _exchange(self, response, body, truncated: bool):
+        if self._file is None or self._size >= self.max_bytes:
+            self._open()
+        request = response.request
+        date = _warc_date()
+        url = str(response.url)
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+
+        status_line = f"{response.http_version} {response.status_code} {response.reason_phrase}\r\n"
+        headers = [f"{name}: {value}\r\n" for name, value in response.headers.multi_items()
+                   if name.lower() not in _STALE_HEADERS]
+        headers.append(f"Content-Length: {len(body)}\r\n")
+        http_head = (status_line + "".join(headers) + "\r\n").encode("latin-1", "replace")
+        warc_headers = {
+            "WARC-Record-ID": response_id,
+            "WARC-Date": date,
+            "WARC-Target-URI": url,
+            "Content-Type": "application/http;msgtype=response",
+            "WARC-Payload-Digest": _digest(body),
+        }
+        if truncated:
+            warc_headers["WARC-Truncated"] = "length"
+        self._emit(_record("response", warc_headers, [http_head, body]))
+
+        target = request.url.raw_path.decode("ascii", "replace")
+        request_head = f"{request.method} {target} {response.http_version}\r\n"
+        request_head += "".join(f"{name}: {value}\r\n" for name, value in request.headers.multi_items())
+        self._emit(_record("request", {
+            "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+            "WARC-Date": date,
+            "WARC-Target-URI": url,
+            "WARC-Concurrent-To": response_id,
+            "Content-Type": "application/http;msgtype=request",
+        }, [(request_head + "\r\n").encode("latin-1", "replace")]))
+
+    def _write_batch(self, batch: list):
+        for response, body, truncated in batch:
+            self._exchange(response, body, truncated)
+        self._file.flush()
+
+    async def _drain(self) -> list | None:
+        item = await self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        while len(batch) < BATCH_SIZE and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is None:
+                # Put the sentinel back so the next drain ends the loop
+                self._queue.put_nowait(None)
+                break
+            batch.append(item)
+        return batch
+
+    async def run(self):
+        """Write queued pages until `close` is called."""
+        try:
+            while (batch := await self._drain()) is not None:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.written += len(batch)
+        except Exception as e:
+            self.error = e
+            # Nothing will drain the queue any more; empty it so blocked `write` calls return
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            raise
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.debug(f"Archived {self.written} pages to {len(self.files)} WARC files")
+
+    async def close(self):
+        """Signal the writer task to finish once everything queued is written."""
+        if self.error is None:
+            await self._queue.put(None)
+
+
+def _read_headers(stream) -> list[bytes] | None:
+    lines = []
+    while True:
+        line = stream.readline()
+        if not line:
+            return None if not lines else lines
+        line = line.rstrip(b"\r\n")
+        if not line:
+            if lines:
+                return lines
+            continue  # blank lines between records
+        lines.append(line)
+
+
+def _parse_fields(lines: list[bytes]) -> dict:
+    fields = {}
+    for line in lines:
+        name, _, value = line.partition(b":")
+        fields[name.strip().decode("latin-1").lower()] = value.strip().decode("utf-8", "replace")
+    return fields
+
+
+def iter_responses(path: str | Path):
+    """
+    Yield (url, status, content_type, body) for every HTTP response record of a WARC file.
+
+    Plain and gzipped (multi-member) files are both read; other record types are skipped.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as stream:
+        while (lines := _read_headers(stream)) is not None:
+            if not lines[0].startswith(b"WARC/"):
+                raise ValueError(f"{path}: expected a WARC record, got {lines[0][:40]!r}")
+            fields = _parse_fields(lines[1:])
+            block = stream.read(int(fields.get("content-length", 0)))
+            if fields.get("warc-type") != "response" or not fields.get("content-type", "").startswith(
+                    "application/http"):
+                continue
+            head, _, body = block.partition(b"\r\n\r\n")
+            status_line, *header_lines = head.split(b"\r\n")
+            parts = status_line.split(b" ", 2)
+            status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else None
+            yield fields.get("warc-target-uri"), status, _parse_fields(header_lines).get("content-type"), body